@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List
+from core.config import Config
+
+SIGNAL_PATTERNS = re.compile(
+    r"(error|erro|exception|traceback|failed|falha|fatal|denied|negad|not found|não encontrad|"
+    r"exit code|returncode|\[stderr\]|warning|aviso|timeout)",
+    re.IGNORECASE
+)
+HEADING_PATTERNS = re.compile(r"^\s*(#{1,6}\s+\S|[A-ZÀ-Ú][\wÀ-ú /-]{2,60}:\s*$|={3,}|-{3,})")
+
+class ToolOutputCompressor:
+    """
+    Reduz saídas de ferramentas antes que voltem ao prompt: extração determinística e, acima do limite, resumo no modelo rápido.
+    Os resumos ficam num LRU de COMPRESSION_CACHE_SIZE entradas, gravado em disco a cada COMPRESSION_CACHE_SAVE_INTERVAL segundos e na saída.
+    """
+
+    def __init__(self, llm=None, cache_path: str = None):
+        self.llm = llm
+        self.cache_path = cache_path or os.path.join(Config.DIRS["cache"], "tool_summaries.json")
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        atexit.register(self.save)
+
+    def _load_cache(self) -> "OrderedDict[str, str]":
+        cache: "OrderedDict[str, str]" = OrderedDict()
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    cache.update(json.load(f))
+            except Exception:
+                return OrderedDict()
+        while len(cache) > Config.COMPRESSION_CACHE_SIZE:
+            cache.popitem(last=False)
+        return cache
+
+    def save(self):
+        with self._lock:
+            # Diretório removido (ex.: diretório temporário de benchmark): não há onde persistir.
+            if not self._dirty or not os.path.isdir(os.path.dirname(self.cache_path)):
+                return
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            summary = self._cache.get(key)
+            if summary is not None:
+                self._cache.move_to_end(key)
+            return summary
+
+    def _cache_put(self, key: str, summary: str):
+        with self._lock:
+            self._cache[key] = summary
+            self._cache.move_to_end(key)
+            while len(self._cache) > Config.COMPRESSION_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            self._dirty = True
+            due = time.monotonic() - self._last_save > Config.COMPRESSION_CACHE_SAVE_INTERVAL
+        if due:
+            self.save()
+
+    @staticmethod
+    def cache_key(output: str, objective: str) -> str:
+        out_hash = hashlib.sha256(output.encode("utf-8", errors="ignore")).hexdigest()
+        obj_hash = hashlib.sha256((objective or "").encode("utf-8", errors="ignore")).hexdigest()
+        return f"{out_hash[:32]}:{obj_hash[:16]}"
+
+    @staticmethod
+    def extract(output: str, max_lines: int = None) -> str:
+        max_lines = max_lines or Config.COMPRESSION_MAX_LINES
+        lines = [line.rstrip() for line in output.splitlines()]
+        lines = [line for line in lines if line.strip()]
+        if len(lines) <= max_lines:
+            return "\n".join(lines)
+
+        head, tail = 5, 5
+        keep: List[int] = list(range(min(head, len(lines))))
+        for i, line in enumerate(lines[head:len(lines) - tail], start=head):
+            if SIGNAL_PATTERNS.search(line) or HEADING_PATTERNS.match(line):
+                keep.append(i)
+        keep.extend(range(max(head, len(lines) - tail), len(lines)))
+
+        if len(keep) > max_lines:
+            keep = keep[:max_lines - tail] + keep[-tail:]
+
+        result, last = [], -1
+        for i in keep:
+            if i != last + 1:
+                result.append(f"... [{i - last - 1} linhas omitidas]")
+            result.append(lines[i])
+            last = i
+        return "\n".join(result)
+
+    async def compress(self, output: str, objective: str) -> str:
+        if len(output) <= Config.COMPRESSION_THRESHOLD:
+            return output
+
+        key = self.cache_key(output, objective)
+        cached = self._cache_get(key)
+        if cached:
+            return cached
+
+        extracted = self.extract(output)
+        summary = extracted
+        if self.llm is not None and len(extracted) > Config.COMPRESSION_THRESHOLD:
+            prompt = f"""OBJETIVO: "{objective}"
+            Resuma a saída de ferramenta abaixo em no máximo 10 linhas, mantendo apenas o que é relevante para o objetivo.
+            Preserve literalmente mensagens de erro, códigos de saída, caminhos, nomes e números.
+
+            SAÍDA:
+            {extracted[:Config.CONTEXT_SIZE]}
+            """
+            response = await self.llm.chat(messages=[{"role": "user", "content": prompt}], temperature=0.0, fast=True, max_tokens=512)
+            if response and not response.startswith(("ERRO:", "Error generating response")):
+                summary = response.strip()
+
+        self._cache_put(key, summary)
+        return summary
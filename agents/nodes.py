@@ -2,26 +2,79 @@ import json
 import re
 import datetime
 import asyncio
-from typing import Dict
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
 from core.llm import LLMEngine
+from core.inference import InferenceScheduler
 from memory.manager import MemoryManager
+from memory.blob_store import BlobStore
+from agents.compressor import ToolOutputCompressor
+from agents.summarizer import ConversationSummarizer
+from core.config import Config
 from tools.registry import ToolRegistry
 from agents.state import AgentState
 
 class TrebuchetNodes:
-    def __init__(self):
-        self.llm = LLMEngine() 
-        self.memory = MemoryManager.get_instance()
-        self.tools = ToolRegistry()
+    def __init__(self, llm=None, memory=None, tools=None):
+        self.llm = llm or LLMEngine() 
+        self.memory = memory or MemoryManager.get_instance()
+        self.tools = tools or ToolRegistry()
+        if isinstance(self.tools, ToolRegistry) and hasattr(self.memory, "wait_ready"):
+            self.tools.set_embedder(self.memory.embed, self.memory.embedder_name, wait_ready=self.memory.wait_ready)
+        self.blobs = BlobStore.get_instance()
+        self.compressor = ToolOutputCompressor(self.llm)
+        self.child_graph = None
+        # O grafo é montado uma vez por processo (UI e API), então o cache vale para todos os turnos da thread.
+        self._mode_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._mode_lock = threading.Lock()
+        self._task_hints = re.compile(Config.MODE_TASK_HINTS, re.IGNORECASE)
+
+    def remember_mode(self, thread_id: Optional[str], mode: str):
+        if not thread_id or thread_id == "unknown":
+            return
+        with self._mode_lock:
+            self._mode_cache[thread_id] = {"mode": mode, "uses": Config.MODE_CACHE_TURNS}
+            self._mode_cache.move_to_end(thread_id)
+            while len(self._mode_cache) > Config.MODE_CACHE_SIZE:
+                self._mode_cache.popitem(last=False)
+
+    def cached_mode(self, thread_id: Optional[str], objective: str = "") -> Optional[str]:
+        """
+        Modo já classificado para a thread, ou None para classificar de novo. Cada consulta consome um uso
+        (reclassificação periódica); "chat" guardado não é reaproveitado para mensagem com cara de tarefa.
+        """
+        with self._mode_lock:
+            entry = self._mode_cache.get(thread_id)
+            if not entry or entry["uses"] <= 0:
+                return None
+            if entry["mode"] == "chat" and self._task_hints.search(objective or ""):
+                del self._mode_cache[thread_id]
+                return None
+            entry["uses"] -= 1
+            return entry["mode"]
+
+    @staticmethod
+    def _retrieval_thread(state: AgentState) -> Optional[str]:
+        # Por padrão a recuperação vê todas as conversas; restringir à thread (e à base compartilhada) é opcional.
+        return state.get("thread_id") if Config.RETRIEVAL_THREAD_SCOPED else None
+
+    def _store_output(self, tool_name: str, output: str, thread_id: str = "unknown") -> Dict:
+        if tool_name in Config.UNCOMPRESSED_TOOLS:
+            return {"tool_name": tool_name, "blob_id": "", "size": len(output), "summary": output}
+        blob_id = self.blobs.put(output, {"tool": tool_name, "thread_id": thread_id})
+        summary = BlobStore.make_ref(blob_id, output)
+        return {"tool_name": tool_name, "blob_id": blob_id, "size": len(output), "summary": summary}
 
     async def pure_chat(self, state: AgentState) -> Dict:
         objective = state.get("objective")
         chat_history = state.get("chat_history", [])
-        memory_context = self.memory.retrieve(objective, k=5)
+        memory_context = self.memory.retrieve(objective, k=5, thread_id=self._retrieval_thread(state), domains=Config.RETRIEVAL_DOMAINS["chat"])
         
         formatted_history = []
-        for msg in chat_history[-10:]:
+        for msg in ConversationSummarizer.recent(chat_history):
             formatted_history.append({"role": msg["role"], "content": msg["content"]})
+        summary = state.get("conversation_summary") or "Sem turnos anteriores resumidos."
         now = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         sys_prompt = f"""Você é o TREBUCHET v4.0. 
         DATA/HORA ATUAL: {now}
@@ -30,6 +83,9 @@ class TrebuchetNodes:
         - Use o contexto de memória abaixo para manter a continuidade histórica.
         - Use o contexto abaixo se for relevante para a pergunta.
         
+        RESUMO DA CONVERSA:
+        {summary}
+
         CONTEXTO DE MEMÓRIA:
         {memory_context}
         """
@@ -65,16 +121,19 @@ class TrebuchetNodes:
             }
         
 
-        memory_context = self.memory.retrieve(objective, k=3)
+        memory_context = self.memory.retrieve(objective, k=3, thread_id=self._retrieval_thread(state), domains=Config.RETRIEVAL_DOMAINS["task"])
         
-        history_str = ""
-        for msg in chat_history[-10:]:
-            history_str += f"{msg['role'].upper()}: {msg['content']}\n"
+        history_str = ConversationSummarizer.render(state.get("conversation_summary"), chat_history)
         
         log_str = "\n".join(internal_log[-5:]) if internal_log else "Nenhuma ação tomada ainda."
-        tools_list = self.tools.get_prompt_list(active_tools=agent_config)
+        step_query = " ".join([objective or "", task_queue[0] if task_queue else ""]).strip()
+        tools_list = self.tools.get_prompt_list(active_tools=agent_config, query=step_query)
         
         tasks_str = "\n".join([f"- {t}" for t in task_queue]) if task_queue else "Fila vazia. É necessário criar um plano de ação."
+
+        fanout_rule = ""
+        if self.child_graph is not None and state.get("subagent_depth", 0) == 0:
+            fanout_rule = f"""7. **SUB-AGENTES PARALELOS**: Se o objetivo tiver partes independentes entre si (ex: analisar vários repositórios), use tool_name "spawn_subtasks" com args {{"tasks": ["subtarefa 1", "subtarefa 2"]}} (máximo {self.subagent_limit()}). Cada subtarefa deve ser autocontida; os resultados voltam juntos no log."""
                 
         prompt = f"""
             OBJETIVO: "{objective}"
@@ -92,6 +151,7 @@ class TrebuchetNodes:
             4. **AUTO-CORREÇÃO (SELF-HEALING)**: Se uma ferramenta falhar por problemas de código, sintaxe ou de importação, use a ferramenta `tool_editor` com a ação `read` para ler o código problemático em `tools/libs/`, e depois use a ação `write` para aplicar a correção estrutural na ferramenta.
             5. **LOOPING E SEGURANÇA**: Se detectar que está a repetir a mesma ação sem sucesso, mude a estratégia.
             6. **MEMÓRIA HISTÓRICA**: Se o usuário perguntar sobre pedidos passados ou se você precisar revisar o que já tentou, use a ferramenta `log_reader` para consultar os logs de execução e conversas anteriores. Não confie apenas no contexto imediato.
+            {fanout_rule}
 
             FERRAMENTAS DISPONÍVEIS: {tools_list}
 
@@ -147,8 +207,10 @@ class TrebuchetNodes:
         response = await self.llm.chat(messages=[{"role": "user", "content": prompt}], temperature=0.0)
         try:
             data = json.loads(re.search(r'\{.*\}', response, re.DOTALL).group(0))
+            mode = data.get("mode", "task") if data.get("mode") in ("chat", "task") else "task"
+            self.remember_mode(state.get("thread_id"), mode)
             return {
-                "current_mode": data.get("mode", "task"),
+                "current_mode": mode,
                 "current_thought": data.get("thought", "Classificando intenção...")
             }
         except:
@@ -216,15 +278,109 @@ class TrebuchetNodes:
         if tool_name in ["finish", "answer_user"]:
             return {"status": "finished", "final_response": args.get("message", "Tarefa concluída.")}
 
-        result = self.tools.execute(tool_name, args)
-        output = str(result.get("output", ""))[:500]
+        result = await asyncio.to_thread(self.tools.execute, tool_name, args)
+        ref = self._store_output(tool_name, str(result.get("output", "")), state.get("thread_id", "unknown"))
         
         return {
-            "completed_log": [f"AÇÃO: {tool_name} | Saída: {output}"],
-            "last_tool_output": output,
+            "tool_outputs": [ref],
+            "last_tool_output": ref["summary"],
+            "next_action": None
+        }
+
+    async def _run_child(self, index: int, task: str, state: AgentState) -> Dict:
+        child_state = {
+            "thread_id": f"{state.get('thread_id', 'unknown')}/sub-{index}",
+            "trace_id": state.get("trace_id"),
+            "objective": task,
+            "status": "architecting",
+            "chat_history": [],
+            "completed_log": [],
+            "current_mode": "task",
+            "agent_config": state.get("agent_config") or {},
+            "micro_task_queue": [],
+            "current_micro_task": "",
+            "last_tool_output": "",
+            "error_counter": 0,
+            "subagent_depth": state.get("subagent_depth", 0) + 1
+        }
+        try:
+            final = await asyncio.wait_for(
+                self.child_graph.ainvoke(child_state, {"recursion_limit": Config.SUBAGENT_RECURSION_LIMIT}),
+                timeout=Config.SUBAGENT_TIMEOUT
+            )
+            return {"task": task, "success": True, "result": final.get("final_response") or final.get("last_tool_output", "")}
+        except asyncio.TimeoutError:
+            return {"task": task, "success": False, "result": f"Tempo limite de {Config.SUBAGENT_TIMEOUT}s excedido."}
+        except Exception as e:
+            return {"task": task, "success": False, "result": f"{type(e).__name__}: {str(e)}"}
+
+    @staticmethod
+    def subagent_limit() -> int:
+        """
+        Sub-agentes simultâneos, limitados pela capacidade do InferenceScheduler: além de SUBAGENTS_PER_SLOT por
+        slot, os filhos só ficariam na fila do modelo. MAX_SUBAGENTS é o teto absoluto.
+        """
+        slots = InferenceScheduler.get_instance().slots
+        return max(1, min(Config.MAX_SUBAGENTS, slots * Config.SUBAGENTS_PER_SLOT))
+
+    async def spawn_subtasks(self, state: AgentState) -> Dict:
+        action = state.get("next_action") or {}
+        tasks = [str(t) for t in action.get("args", {}).get("tasks", []) if str(t).strip()]
+        limit = self.subagent_limit()
+
+        if not tasks:
+            return {"subtask_results": [], "next_action": None}
+
+        # Excedentes rodam em lotes sucessivos. As chamadas ao modelo dos filhos entram na fila do InferenceScheduler;
+        # o que se sobrepõe de fato é a execução das ferramentas.
+        results = []
+        for start in range(0, len(tasks), limit):
+            batch = tasks[start:start + limit]
+            results += await asyncio.gather(*[self._run_child(start + i, t, state) for i, t in enumerate(batch)])
+
+        return {
+            "subtask_results": results,
+            "current_thought": f"{len(results)} sub-agentes concluídos ({sum(r['success'] for r in results)} com sucesso).",
             "next_action": None
         }
 
+    async def join_subtasks(self, state: AgentState) -> Dict:
+        results = state.get("subtask_results", [])
+        parts = []
+        for i, r in enumerate(results):
+            status = "OK" if r["success"] else "FALHA"
+            parts.append(f"### Subtarefa {i + 1} [{status}]: {r['task']}\n{r['result']}")
+        joined = "\n\n".join(parts) if parts else "Nenhuma subtarefa válida foi informada em 'tasks'."
+
+        ref = self._store_output("spawn_subtasks", joined, state.get("thread_id", "unknown"))
+        return {
+            "tool_outputs": [ref],
+            "last_tool_output": ref["summary"],
+            "subtask_results": []
+        }
+
+    async def compress_output(self, state: AgentState) -> Dict:
+        refs = state.get("tool_outputs", [])
+        if not refs:
+            return {}
+
+        ref = refs[-1]
+        if ref["tool_name"] in Config.UNCOMPRESSED_TOOLS:
+            return {
+                "completed_log": [f"AÇÃO: {ref['tool_name']} | Saída: {ref['summary']}"],
+                "last_tool_output": ref["summary"]
+            }
+
+        full_output = self.blobs.get(ref["blob_id"]) or ref["summary"]
+        compressed = await self.compressor.compress(full_output, state.get("objective", ""))
+        if len(compressed) < len(full_output):
+            compressed = f"{compressed}\n[saída completa: {ref['size']} chars em blob:{ref['blob_id'][:16]}]"
+
+        return {
+            "completed_log": [f"AÇÃO: {ref['tool_name']} | Saída: {compressed}"],
+            "last_tool_output": compressed
+        }
+
     async def unified_agent(self, state: AgentState) -> Dict:
         print("\n[AGENTE] Raciocinando...")
         
@@ -232,7 +388,7 @@ class TrebuchetNodes:
         history = state.get("completed_log", [])
         agent_config = state.get("agent_config", {}).get("tools", {})
         history_str = "\n".join(history[-8:]) if history else "Início da tarefa."
-        tools_list = self.tools.get_prompt_list(active_tools=agent_config)
+        tools_list = self.tools.get_prompt_list(active_tools=agent_config, query=objective)
         
         prompt = f"""
         OBJETIVO: "{objective}"
@@ -296,13 +452,15 @@ class TrebuchetNodes:
         try:
 
             result = self.tools.execute(tool_name, args)
-            output = str(result.get("output", ""))[:500]
+            ref = self._store_output(tool_name, str(result.get("output", "")), state.get("thread_id", "unknown"))
+            output = ref["summary"]
             success = result.get("success", False)
             
             log_entry = f"AÇÃO: {tool_name} | STATUS: {'✅' if success else '❌'}\n   Saída: {output}"
             
             return {
                 "completed_log": [log_entry],
+                "tool_outputs": [ref],
                 "status": "building",
                 "last_tool_output": output,
                 "current_thought": thought,
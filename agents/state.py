@@ -1,25 +1,48 @@
-from typing import TypedDict, List, Literal, Optional, Dict, Annotated
-import operator
+from typing import TypedDict, List, Literal, Optional, Dict, Annotated, Callable
+from core.config import Config
+
+def capped_add(limit: int) -> Callable[[List, List], List]:
+    """Reducer de ring-buffer: concatena como operator.add, mas mantém só os últimos `limit` itens."""
+    def _reducer(current: List, new: List) -> List:
+        merged = (current or []) + (new or [])
+        return merged[-limit:]
+    return _reducer
+
+class ToolOutputRef(TypedDict):
+    tool_name: str
+    blob_id: str
+    size: int
+    summary: str
 
 class AgentState(TypedDict):
     thread_id: str
-    chat_history: Annotated[List[Dict], operator.add]       
+    # Trace da execução atual do grafo (uma por missão/turno; a thread reúne várias).
+    trace_id: Optional[str]
+    chat_history: Annotated[List[Dict], capped_add(Config.STATE_HISTORY_LIMIT)]
+    conversation_summary: Optional[str]
     objective: str
     status: Literal["architecting", "building", "finished", "error_recovery", "awaiting_approval"]
-    
+
     current_mode: Literal["chat", "task"]
+    pinned_mode: Optional[Literal["chat", "task"]]
     final_response: Optional[str]
     agent_config: Optional[Dict]
     micro_task_queue: List[str]
-    completed_log: Annotated[List[str], operator.add]
-    
+    completed_log: Annotated[List[str], capped_add(Config.STATE_LOG_LIMIT)]
+    tool_outputs: Annotated[List[ToolOutputRef], capped_add(Config.STATE_LOG_LIMIT)]
+
     current_micro_task: str
     current_thought: str
     last_tool_output: str
-    error_counter: int 
+    error_counter: int
 
     pending_approval: Optional[str]
     last_error: Optional[str]
     failed_task: Optional[str]
-    
-    next_action: Optional[Dict]
\ No newline at end of file
+
+    next_action: Optional[Dict]
+
+    subagent_depth: int
+    subtask_results: List[Dict]
+
+    resume_node: Optional[str]
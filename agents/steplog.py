@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from core.config import Config
+
+class StepLog:
+    """
+    Log persistente de passos do grafo por thread_id, em JSONL. Cada passo grava as atualizações do nó e o estado de
+    entrada: completo a cada STEPLOG_CHECKPOINT_EVERY passos (checkpoint) e, nos demais, só as chaves que mudaram
+    desde o passo anterior. load() reconstrói o estado completo de cada passo.
+    """
+    _instance = None
+
+    def __init__(self, base_path: Optional[str] = None):
+        self.base_path = base_path or os.path.join(Config.DIRS["logs"], "steps")
+        os.makedirs(self.base_path, exist_ok=True)
+        self._counters: Dict[str, int] = {}
+        # Último estado gravado por thread (chave -> JSON), base do próximo delta.
+        self._last_states: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _path(self, thread_id: str) -> str:
+        safe = re.sub(r"[^\w.-]", "_", thread_id or "unknown")
+        return os.path.join(self.base_path, f"{safe}.jsonl")
+
+    def _next_step(self, thread_id: str) -> int:
+        if thread_id not in self._counters:
+            path = self._path(thread_id)
+            count = 0
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    count = sum(1 for _ in f)
+            self._counters[thread_id] = count
+        step = self._counters[thread_id]
+        self._counters[thread_id] += 1
+        return step
+
+    def _encode_state(self, thread_id: str, step: int, state_in: Dict) -> Dict:
+        encoded = {k: json.dumps(v, ensure_ascii=False, default=str, sort_keys=True) for k, v in state_in.items()}
+        previous = self._last_states.pop(thread_id, None)
+        self._last_states[thread_id] = encoded
+        while len(self._last_states) > Config.STEPLOG_CACHED_THREADS:
+            self._last_states.popitem(last=False)
+
+        # Sem base em memória (primeiro passo, reinício ou thread descartada do cache) o passo vira checkpoint.
+        if previous is None or step % Config.STEPLOG_CHECKPOINT_EVERY == 0:
+            return {"state": state_in}
+        changed = {k: state_in[k] for k, v in encoded.items() if previous.get(k) != v}
+        removed = [k for k in previous if k not in encoded]
+        entry = {"state_delta": changed}
+        if removed:
+            entry["state_removed"] = removed
+        return entry
+
+    def record(self, thread_id: str, node: str, state_in: Dict, updates: Dict, duration: float = 0.0) -> int:
+        with self._lock:
+            step = self._next_step(thread_id)
+            entry = {
+                "step": step,
+                "node": node,
+                "timestamp": time.time(),
+                "duration": round(duration, 4),
+                **self._encode_state(thread_id, step, state_in),
+                "updates": updates
+            }
+            with open(self._path(thread_id), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        return step
+
+    def load(self, thread_id: str) -> List[Dict]:
+        path = self._path(thread_id)
+        if not os.path.exists(path):
+            return []
+        steps, state = [], None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    state = None
+                    continue
+                if "state" in entry:
+                    state = entry["state"]
+                elif state is not None:
+                    state = {k: v for k, v in state.items() if k not in entry.get("state_removed", [])}
+                    state.update(entry.pop("state_delta"))
+                    entry.pop("state_removed", None)
+                    entry["state"] = state
+                else:
+                    # Delta sem checkpoint anterior legível: o estado deste passo não pode ser reconstruído.
+                    continue
+                steps.append(entry)
+        return steps
+
+    def summary(self, thread_id: str) -> List[Dict]:
+        return [
+            {
+                "step": s["step"],
+                "node": s["node"],
+                "duration": s.get("duration", 0.0),
+                "thought": (s.get("updates") or {}).get("current_thought"),
+                "action": (s.get("updates") or {}).get("next_action")
+            }
+            for s in self.load(thread_id)
+        ]
+
+    def fork(self, thread_id: str, step: int, overrides: Dict = None) -> Tuple[str, Dict]:
+        """Prepara uma nova thread a partir do passo `step`, reaproveitando tudo o que foi calculado antes dele.
+
+        O estado retornado é o estado de entrada do passo escolhido (com as alterações aplicadas) e
+        `resume_node` aponta para o nó que será reexecutado. Nada é gravado aqui: depois que a nova thread
+        for aceita, copy_history() copia os passos anteriores para o log dela, de modo que o fork também
+        possa ser bifurcado depois.
+        """
+        steps = self.load(thread_id)
+        target = next((s for s in steps if s["step"] == step), None)
+        if target is None:
+            raise KeyError(f"Passo {step} não encontrado na thread '{thread_id}'.")
+
+        overrides = dict(overrides or {})
+        new_thread_id = f"{thread_id}.fork-{uuid.uuid4().hex[:8]}"
+
+        state = dict(target["state"])
+        instructions = overrides.pop("instructions", None)
+        state.update({k: v for k, v in overrides.items() if v is not None})
+        if instructions:
+            state["objective"] = f"{state.get('objective', '')}\n[INSTRUÇÕES ADICIONAIS]: {instructions}"
+        state["thread_id"] = new_thread_id
+        state["resume_node"] = overrides.get("resume_node") or target["node"]
+        return new_thread_id, state
+
+    def copy_history(self, thread_id: str, new_thread_id: str, step: int):
+        """Copia para `new_thread_id` os passos de `thread_id` anteriores a `step`, como gravados (checkpoints e deltas)."""
+        with self._lock:
+            with open(self._path(thread_id), "r", encoding="utf-8") as src, \
+                    open(self._path(new_thread_id), "w", encoding="utf-8") as dst:
+                for line in src:
+                    try:
+                        if json.loads(line)["step"] >= step:
+                            break
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+                    dst.write(line)
+            self._counters.pop(new_thread_id, None)
+            self._last_states.pop(new_thread_id, None)
@@ -0,0 +1,52 @@
+from typing import Dict, List, Optional, Tuple
+from core.config import Config
+
+class ConversationSummarizer:
+    """Mantém um resumo incremental por conversa, para que os prompts usem resumo + últimos turnos em vez do histórico bruto."""
+
+    def __init__(self, llm=None):
+        self.llm = llm
+
+    @staticmethod
+    def recent(history: List[Dict], keep: int = None) -> List[Dict]:
+        keep = keep if keep is not None else Config.HISTORY_RECENT_MESSAGES
+        return history[-keep:] if keep else []
+
+    @staticmethod
+    def pending(history: List[Dict], summarized_upto: int, keep: int = None) -> List[Dict]:
+        keep = keep if keep is not None else Config.HISTORY_RECENT_MESSAGES
+        cutoff = max(0, len(history) - keep)
+        return history[summarized_upto:cutoff]
+
+    async def update(self, summary: str, summarized_upto: int, history: List[Dict]) -> Tuple[str, int]:
+        """Incorpora ao resumo as mensagens que saíram da janela recente. Retorna (resumo, índice até onde resumiu)."""
+        new_messages = self.pending(history, summarized_upto)
+        if not new_messages or self.llm is None:
+            return summary, summarized_upto
+
+        transcript = "\n".join(f"{m['role'].upper()}: {str(m['content'])[:Config.SUMMARY_MESSAGE_CHARS]}" for m in new_messages)
+        prompt = f"""Atualize o resumo de uma conversa entre o usuário e o assistente TREBUCHET.
+        Mantenha fatos, decisões, preferências do usuário, nomes, caminhos e pendências. Descarte cumprimentos e redundâncias.
+        Responda apenas com o novo resumo, em no máximo {Config.SUMMARY_MAX_WORDS} palavras.
+
+        RESUMO ATUAL:
+        {summary or "(vazio)"}
+
+        NOVAS MENSAGENS:
+        {transcript}
+        """
+        # Resumo é trabalho de fundo: cede o modelo a qualquer turno de conversa na fila.
+        response = await self.llm.chat(messages=[{"role": "user", "content": prompt}], temperature=0.0, fast=True, max_tokens=512, background=True)
+        if not response or response.startswith(("ERRO:", "Error generating response")):
+            return summary, summarized_upto
+
+        return response.strip(), summarized_upto + len(new_messages)
+
+    @staticmethod
+    def render(summary: Optional[str], history: List[Dict]) -> str:
+        parts = []
+        if summary:
+            parts.append(f"RESUMO DA CONVERSA ATÉ AQUI: {summary}")
+        for msg in ConversationSummarizer.recent(history):
+            parts.append(f"{msg['role'].upper()}: {msg['content']}")
+        return "\n".join(parts)
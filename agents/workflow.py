@@ -1,21 +1,83 @@
+import time
 from langgraph.graph import StateGraph, END
 from agents.state import AgentState
 from agents.nodes import TrebuchetNodes
+from agents.steplog import StepLog
+from core.tracing import Tracer
+
+RESUMABLE_NODES = ["classifier", "orchestrator", "tool_executor", "compressor", "critic", "chat_mode", "fan_out", "join"]
 
 class TrebuchetOrchestrator:
-    def __init__(self):
-        self.nodes = TrebuchetNodes()
+    def __init__(self, nodes: TrebuchetNodes = None):
+        self.nodes = nodes or TrebuchetNodes()
+        self.steps = StepLog.get_instance()
+        self.tracer = Tracer.get_instance()
+
+    def _wrap(self, name: str, fn):
+        async def _node(state: AgentState):
+            thread_id = state.get("thread_id", "unknown")
+            with self.tracer.span(name, kind="node", trace_id=state.get("trace_id") or thread_id, thread_id=thread_id) as span:
+                start = time.perf_counter()
+                updates = await fn(state)
+                if state.get("resume_node") == name:
+                    # O fork já retomou por este nó: limpa o marcador para não reentrar nele em execuções seguintes.
+                    updates = dict(updates or {}, resume_node=None)
+                step = self.steps.record(thread_id, name, dict(state), updates or {}, time.perf_counter() - start)
+                span.set(step=step, updated_keys=sorted((updates or {}).keys()))
+            return updates
+        return _node
+
+    def _route_entry(self, state: AgentState) -> str:
+        resume = state.get("resume_node")
+        if resume in RESUMABLE_NODES:
+            return resume
+
+        # Modo fixado pelo chamador (API ou seletor da UI) ou já classificado nesta thread: pula o classificador.
+        mode = state.get("pinned_mode") or self.nodes.cached_mode(state.get("thread_id"), state.get("objective", ""))
+        if mode == "chat":
+            return "chat_mode"
+        if mode == "task":
+            return "orchestrator"
+        return "classifier"
+
+    @staticmethod
+    def _route_action(state: AgentState) -> str:
+        action = state.get("next_action") or {}
+        return "fan_out" if action.get("tool_name") == "spawn_subtasks" else "tool_executor"
+
+    def build_child(self):
+        workflow = StateGraph(AgentState)
+
+        workflow.add_node("orchestrator", self._wrap("orchestrator", self.nodes.orchestrator))
+        workflow.add_node("tool_executor", self._wrap("tool_executor", self.nodes.tool_executor))
+        workflow.add_node("compressor", self._wrap("compressor", self.nodes.compress_output))
+        workflow.add_node("critic", self._wrap("critic", self.nodes.critic))
+
+        workflow.set_entry_point("orchestrator")
+        workflow.add_edge("orchestrator", "tool_executor")
+        workflow.add_conditional_edges(
+            "tool_executor",
+            lambda x: END if x.get("status") == "finished" else "compressor",
+            {END: END, "compressor": "compressor"}
+        )
+        workflow.add_edge("compressor", "critic")
+        workflow.add_edge("critic", "orchestrator")
+        return workflow.compile()
 
     def build(self):
+        self.nodes.child_graph = self.build_child()
         workflow = StateGraph(AgentState)
     
-        workflow.add_node("classifier", self.nodes.classifier)
-        workflow.add_node("orchestrator", self.nodes.orchestrator)
-        workflow.add_node("tool_executor", self.nodes.tool_executor) 
-        workflow.add_node("critic", self.nodes.critic)
-        workflow.add_node("chat_mode", self.nodes.pure_chat)
+        workflow.add_node("classifier", self._wrap("classifier", self.nodes.classifier))
+        workflow.add_node("orchestrator", self._wrap("orchestrator", self.nodes.orchestrator))
+        workflow.add_node("tool_executor", self._wrap("tool_executor", self.nodes.tool_executor))
+        workflow.add_node("compressor", self._wrap("compressor", self.nodes.compress_output))
+        workflow.add_node("critic", self._wrap("critic", self.nodes.critic))
+        workflow.add_node("chat_mode", self._wrap("chat_mode", self.nodes.pure_chat))
+        workflow.add_node("fan_out", self._wrap("fan_out", self.nodes.spawn_subtasks))
+        workflow.add_node("join", self._wrap("join", self.nodes.join_subtasks))
         
-        workflow.set_entry_point("classifier")
+        workflow.set_conditional_entry_point(self._route_entry, {n: n for n in RESUMABLE_NODES})
         
         workflow.add_conditional_edges(
             "classifier",
@@ -23,14 +85,22 @@ class TrebuchetOrchestrator:
             {"chat_mode": "chat_mode", "orchestrator": "orchestrator"}
         )
         
-        workflow.add_edge("orchestrator", "tool_executor")
+        workflow.add_conditional_edges(
+            "orchestrator",
+            self._route_action,
+            {"fan_out": "fan_out", "tool_executor": "tool_executor"}
+        )
+        workflow.add_edge("fan_out", "join")
+        workflow.add_edge("join", "compressor")
         
 
         workflow.add_conditional_edges(
             "tool_executor",
-            lambda x: END if x.get("status") == "finished" else "critic",
-            {END: END, "critic": "critic"}
+            lambda x: END if x.get("status") == "finished" else "compressor",
+            {END: END, "compressor": "compressor"}
         )
+
+        workflow.add_edge("compressor", "critic")
     
         workflow.add_edge("critic", "orchestrator")
         
@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+from core.config import Config
+
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1}
+
+class SchedulerSaturated(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class MissionScheduler:
+    """Fila de missões com prioridade, cota por cliente e controle de admissão (429 quando saturada)."""
+
+    def __init__(self, runner: Callable[[Dict], Awaitable[None]], workers: int = None, max_queue: int = None, client_quota: int = None):
+        self.runner = runner
+        self.workers = workers or Config.MISSION_WORKERS
+        self.max_queue = max_queue or Config.MISSION_QUEUE_SIZE
+        self.client_quota = client_quota or Config.MISSION_CLIENT_QUOTA
+
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._tasks = []
+        self.jobs: Dict[str, Dict] = {}
+        self._finished = deque(maxlen=200)
+        self._per_client: Dict[str, int] = {}
+        self.running = 0
+        self._waits = deque(maxlen=200)
+        self._durations = deque(maxlen=200)
+
+    async def start(self):
+        if self.queue is not None:
+            return
+        self.queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def _retry_after(self) -> int:
+        avg_duration = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        backlog = (self.queue.qsize() if self.queue else 0) + self.running
+        return max(1, int(avg_duration * backlog / self.workers))
+
+    def submit(self, job_id: str, state: Dict, client_id: str = "anonymous", priority: str = "batch") -> Dict:
+        if self.queue is None:
+            raise RuntimeError("MissionScheduler não foi iniciado.")
+        if priority not in PRIORITY_CLASSES:
+            priority = "batch"
+
+        if self._per_client.get(client_id, 0) >= self.client_quota:
+            raise SchedulerSaturated(f"Cota de {self.client_quota} missões simultâneas atingida para o cliente.", self._retry_after())
+        if self.queue.full():
+            raise SchedulerSaturated("Fila de missões cheia.", self._retry_after())
+
+        job = {
+            "id": job_id,
+            "client_id": client_id,
+            "priority": priority,
+            "status": "queued",
+            "enqueued_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        }
+        self.jobs[job_id] = job
+        self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+        self.queue.put_nowait((PRIORITY_CLASSES[priority], next(self._seq), job_id, state))
+        return {"job_id": job_id, "position": self.queue.qsize(), "priority": priority}
+
+    async def _worker(self):
+        while True:
+            _, _, job_id, state = await self.queue.get()
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self._waits.append(job["started_at"] - job["enqueued_at"])
+            self.running += 1
+            try:
+                await self.runner(state)
+                job["status"] = "finished"
+            except asyncio.CancelledError:
+                job["status"] = "cancelled"
+                raise
+            except Exception as e:
+                job["status"] = "error"
+                job["error"] = str(e)
+                print(f"[SCHEDULER] Missão {job_id} falhou: {e}")
+            finally:
+                job["finished_at"] = time.time()
+                self._durations.append(job["finished_at"] - job["started_at"])
+                self.running -= 1
+                self._per_client[job["client_id"]] -= 1
+                if self._per_client[job["client_id"]] <= 0:
+                    self._per_client.pop(job["client_id"], None)
+                self._forget_old(job_id)
+                self.queue.task_done()
+
+    def _forget_old(self, job_id: str):
+        if len(self._finished) == self._finished.maxlen:
+            self.jobs.pop(self._finished[0], None)
+        self._finished.append(job_id)
+
+    def stats(self) -> Dict:
+        waits = sorted(self._waits)
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_capacity": self.max_queue,
+            "running": self.running,
+            "workers": self.workers,
+            "clients": dict(self._per_client),
+            "avg_wait_s": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_wait_s": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+            "avg_duration_s": round(sum(self._durations) / len(self._durations), 3) if self._durations else 0.0
+        }
@@ -1,10 +1,18 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from typing import Optional, Dict, Literal
 import uvicorn
 import threading
+import uuid
 from agents.workflow import TrebuchetOrchestrator
 from agents.state import AgentState
+from agents.steplog import StepLog
+from api.scheduler import MissionScheduler, SchedulerSaturated
 from core.config import Config
+from core.tracing import Tracer
+from memory.manager import MemoryManager
+from memory.ingest_queue import IngestQueue
 
 app = FastAPI(title="Trebuchet API v3.0")
 orchestrator = TrebuchetOrchestrator()
@@ -12,15 +20,27 @@ graph = orchestrator.build()
 
 class MissionRequest(BaseModel):
     objective: str
+    # "auto" (padrão) passa pelo classificador; "chat"/"task" fixam o modo.
+    mode: Optional[Literal["chat", "task", "auto"]] = "auto"
+
+class ForkRequest(BaseModel):
+    step: int
+    objective: Optional[str] = None
+    instructions: Optional[str] = None
+    agent_config: Optional[Dict] = None
 
 @app.get("/")
 def read_root():
     return {"status": "Trebuchet v3.0 ONLINE", "mode": "Hybrid Compute (CPU/GPU)"}
 
-def run_agent_sync(objective: str):
+def build_initial_state(objective: str, thread_id: str, mode: Optional[str] = "auto") -> AgentState:
     # Initial state must match AgentState TypedDict in agents/state.py
-    initial: AgentState = {
+    return {
+        "thread_id": thread_id,
+        "trace_id": uuid.uuid4().hex,
         "objective": objective,
+        "current_mode": mode if mode in ("chat", "task") else "task",
+        "pinned_mode": mode if mode in ("chat", "task") else None,
         "status": "architecting",
         "micro_task_queue": [],
         "completed_log": [],
@@ -31,17 +51,97 @@ def run_agent_sync(objective: str):
         "last_error": None,
         "failed_task": None
     }
-    
-    # Executa o grafo
-    # Nota: Em produção, isso deveria salvar o estado em DB
-    for event in graph.stream(initial):
-        # Aqui poderiamos logar ou enviar via WebSocket
-        pass 
+
+async def run_agent(initial: AgentState):
+    # Executa o grafo; cada passo fica registrado no StepLog da thread e a execução num trace próprio (trace_id)
+    with Tracer.get_instance().span("mission", kind="mission", trace_id=initial.get("trace_id"), thread_id=initial["thread_id"],
+                                    objective=initial["objective"][:200]):
+        async for event in graph.astream(initial):
+            # Aqui poderiamos logar ou enviar via WebSocket
+            pass 
+
+scheduler = MissionScheduler(run_agent)
+
+@app.on_event("startup")
+async def start_scheduler():
+    await scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+
+def _client_id(request: Request) -> str:
+    # A cota é por endereço de origem; X-Forwarded-For só vale quando a conexão vem de um proxy confiável.
+    host = request.client.host if request.client else "anonymous"
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded and host in Config.API_TRUSTED_PROXIES:
+        return forwarded.split(",")[0].strip()
+    return host
+
+def _priority(state: AgentState) -> str:
+    # Definida no servidor: só conversas (modo chat fixado) furam a fila; missões de tarefa e forks são lote.
+    return "interactive" if state.get("pinned_mode") == "chat" else "batch"
+
+def _enqueue(request: Request, thread_id: str, state: AgentState):
+    try:
+        return scheduler.submit(thread_id, state, client_id=_client_id(request), priority=_priority(state)), None
+    except SchedulerSaturated as e:
+        return None, JSONResponse(
+            status_code=429,
+            content={"detail": e.reason, "retry_after": e.retry_after, **scheduler.stats()},
+            headers={"Retry-After": str(e.retry_after)}
+        )
 
 @app.post("/mission")
-async def start_mission(mission: MissionRequest, background_tasks: BackgroundTasks):
-    background_tasks.add_task(run_agent_sync, mission.objective)
-    return {"message": "Mission Started", "objective": mission.objective}
+async def start_mission(mission: MissionRequest, request: Request):
+    thread_id = str(uuid.uuid4())
+    state = build_initial_state(mission.objective, thread_id, mission.mode)
+    ticket, rejection = _enqueue(request, thread_id, state)
+    if rejection:
+        return rejection
+    return {"message": "Mission Queued", "objective": mission.objective, "thread_id": thread_id, "trace_id": state["trace_id"], **ticket}
+
+@app.get("/mission/{thread_id}")
+def mission_status(thread_id: str):
+    job = scheduler.jobs.get(thread_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Missão desconhecida ou já descartada do histórico.")
+    return job
+
+@app.get("/scheduler")
+def scheduler_stats():
+    return scheduler.stats()
+
+@app.get("/memory/stats")
+def memory_stats():
+    return dict(MemoryManager.get_instance().stats(), ingest_queue=IngestQueue.get_instance().status())
+
+@app.get("/mission/{thread_id}/steps")
+def list_steps(thread_id: str):
+    steps = StepLog.get_instance().summary(thread_id)
+    if not steps:
+        raise HTTPException(status_code=404, detail="Thread sem passos registrados.")
+    return {"thread_id": thread_id, "steps": steps}
+
+@app.post("/mission/{thread_id}/fork")
+async def fork_mission(thread_id: str, fork: ForkRequest, request: Request):
+    try:
+        new_thread_id, state = StepLog.get_instance().fork(thread_id, fork.step, {
+            "objective": fork.objective,
+            "instructions": fork.instructions,
+            "agent_config": fork.agent_config,
+            "trace_id": uuid.uuid4().hex
+        })
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    ticket, rejection = _enqueue(request, new_thread_id, state)
+    if rejection:
+        return rejection
+    # Só grava o log da nova thread depois da admissão: um 429 não deixa log órfão.
+    StepLog.get_instance().copy_history(thread_id, new_thread_id, fork.step)
+    return {"message": "Mission Forked", "thread_id": new_thread_id, "trace_id": state["trace_id"], "from_step": fork.step,
+            "resume_node": state["resume_node"], **ticket}
 
 def start():
     uvicorn.run(app, host=Config.API_HOST, port=Config.API_PORT)
@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+from typing import Dict, List, Tuple
+import numpy as np
+from memory.embedders import build_embedder
+
+# Frases em português e inglês, com código e identificadores, parecidas com o que a memória indexa.
+SAMPLES = [
+    "Qual é a capital da França?",
+    "A capital da França é Paris.",
+    "ModuleNotFoundError: No module named 'pyautogui'",
+    "def retrieve(self, query: str, k: int = 5) -> str:",
+    "Liste os arquivos da pasta de downloads usando o terminal.",
+    "O usuário prefere respostas curtas e em português.",
+    "git commit -m 'corrige o parser de argumentos'",
+    "Erro de conexão: ECONNREFUSED 127.0.0.1:8000",
+    "Reunião com a equipe de dados na quinta-feira às 14h.",
+    "The quick brown fox jumps over the lazy dog.",
+    "Instale as dependências com pip install -r requirements.txt",
+    "Resumo: o agente analisou três repositórios e encontrou dois bugs.",
+]
+
+def _rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(usage / 1024 if sys.platform != "darwin" else usage / (1024 * 1024), 1)
+
+def _load(backend: str):
+    start = time.perf_counter()
+    embedder = build_embedder(backend)
+    return embedder, time.perf_counter() - start
+
+def _embed(embedder, texts: List[str], rounds: int) -> Tuple[np.ndarray, float]:
+    vectors = np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        embedder.embed_documents(texts)
+    return vectors, (time.perf_counter() - start) / rounds
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+def _topk_agreement(a: np.ndarray, b: np.ndarray, k: int) -> float:
+    """Fração dos vizinhos top-k (por similaridade entre amostras) que coincidem entre os dois backends."""
+    sa, sb = a @ a.T, b @ b.T
+    np.fill_diagonal(sa, -np.inf)
+    np.fill_diagonal(sb, -np.inf)
+    hits = [len(set(np.argsort(-sa[i])[:k]) & set(np.argsort(-sb[i])[:k])) / k for i in range(len(a))]
+    return float(np.mean(hits))
+
+def compare(texts: List[str], reference: str, candidate: str, rounds: int) -> Dict:
+    rss_start = _rss_mb()
+    cand, cand_load = _load(candidate)
+    cand_vecs, cand_time = _embed(cand, texts, rounds)
+    rss_cand = _rss_mb()
+
+    ref, ref_load = _load(reference)
+    ref_vecs, ref_time = _embed(ref, texts, rounds)
+
+    a, b = _normalize(ref_vecs), _normalize(cand_vecs)
+    cosine = (a * b).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "reference": ref.name,
+        "candidate": cand.name,
+        "cosine_mean": round(float(cosine.mean()), 5),
+        "cosine_min": round(float(cosine.min()), 5),
+        "top3_agreement": round(_topk_agreement(a, b, min(3, len(texts) - 1)), 3),
+        "load_s": {"reference": round(ref_load, 3), "candidate": round(cand_load, 3)},
+        "embed_ms_per_batch": {"reference": round(1000 * ref_time, 2), "candidate": round(1000 * cand_time, 2)},
+        # O candidato é carregado primeiro, então o RSS até ali é só dele.
+        "candidate_rss_mb": round(rss_cand - rss_start, 1)
+    }
+
+def _corpus(path: str, limit: int) -> List[str]:
+    texts = []
+    for root, _, files in os.walk(path):
+        for f in sorted(files):
+            if f.endswith((".md", ".txt", ".py")):
+                with open(os.path.join(root, f), encoding="utf-8", errors="ignore") as fd:
+                    texts.extend(p.strip() for p in fd.read().split("\n\n") if len(p.strip()) > 40)
+            if len(texts) >= limit:
+                return texts[:limit]
+    return texts
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Paridade entre backends de embedding (padrão: huggingface fp32 vs onnx int8).")
+    parser.add_argument("--reference", default="huggingface")
+    parser.add_argument("--candidate", default="onnx")
+    parser.add_argument("--corpus", help="Diretório com .md/.txt/.py para usar no lugar das frases embutidas.")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--min-cosine", type=float, default=0.97, help="Falha (exit 1) se algum par ficar abaixo disto.")
+    parser.add_argument("--min-agreement", type=float, default=0.8,
+                        help="Falha (exit 1) se a concordância dos vizinhos top-3 (recall do candidato) ficar abaixo disto.")
+    parser.add_argument("--output", help="Grava o resultado em JSON neste caminho.")
+    args = parser.parse_args()
+
+    texts = _corpus(args.corpus, args.limit) if args.corpus else SAMPLES
+    result = compare(texts, args.reference, args.candidate, args.rounds)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    if result["cosine_min"] < args.min_cosine:
+        print(f"PARIDADE: cosseno mínimo {result['cosine_min']} < {args.min_cosine}")
+        failed = True
+    if result["top3_agreement"] < args.min_agreement:
+        print(f"PARIDADE: concordância top-3 {result['top3_agreement']} < {args.min_agreement}")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
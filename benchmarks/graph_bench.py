@@ -0,0 +1,213 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import uuid
+import statistics
+import gc
+import tracemalloc
+from typing import Dict, List
+from core.config import Config
+from core.replay import Cassette, replay_components
+
+BENCH_DIR = os.path.dirname(__file__)
+MISSIONS_DIR = os.path.join(BENCH_DIR, "missions")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines.json")
+
+# Métricas de tempo variam muito entre máquinas de CI; tamanhos e contagens são quase determinísticos.
+TIME_METRICS = ("wall_ms_p50", "graph_overhead_ms_p50")
+SIZE_METRICS = ("state_max_bytes", "state_final_bytes", "peak_alloc_kb", "steps")
+# Drift acima do baseline significa prompt ou argumentos alterados sem regravar a cassete: falha sem tolerância.
+EXACT_METRICS = ("replay_drift",)
+
+def _isolate_dirs():
+    tmp = tempfile.mkdtemp(prefix="trebuchet-bench-")
+    for key in ("logs", "cache"):
+        Config.DIRS[key] = os.path.join(tmp, key)
+        os.makedirs(Config.DIRS[key], exist_ok=True)
+    return tmp
+
+def _build_graph(cassette: Cassette, rerecord: bool = False):
+    from agents.nodes import TrebuchetNodes
+    from agents.workflow import TrebuchetOrchestrator
+
+    components = replay_components(cassette, rerecord=rerecord)
+    nodes = TrebuchetNodes(**components)
+    return TrebuchetOrchestrator(nodes).build(), components
+
+def _reset_caches():
+    summaries = os.path.join(Config.DIRS["cache"], "tool_summaries.json")
+    if os.path.exists(summaries):
+        os.remove(summaries)
+
+async def _run(cassette: Cassette, iteration: int, measure_state: bool = False, rerecord: bool = False) -> Dict:
+    from core.tracing import Tracer
+
+    _reset_caches()
+    graph, components = _build_graph(cassette, rerecord)
+    state = dict(cassette.initial_state)
+    state["thread_id"] = f"bench-{cassette.name}-{iteration}"
+    state["trace_id"] = uuid.uuid4().hex
+
+    spans: List[Dict] = []
+    tracer = Tracer.get_instance()
+    tracer.add_listener(spans.append)
+    state_sizes = []
+    try:
+        start = time.perf_counter()
+        with tracer.span("mission", kind="mission", trace_id=state["trace_id"], thread_id=state["thread_id"]) as root:
+            if measure_state:
+                async for values in graph.astream(state, stream_mode="values"):
+                    state_sizes.append(len(json.dumps(values, ensure_ascii=False, default=str)))
+            else:
+                async for _ in graph.astream(state):
+                    pass
+        wall = time.perf_counter() - start
+    finally:
+        tracer.remove_listener(spans.append)
+
+    top_nodes = [s for s in spans if s["kind"] == "node" and s["parent_id"] == root.span_id]
+    node_ms: Dict[str, List[float]] = {}
+    for s in spans:
+        if s["kind"] == "node":
+            node_ms.setdefault(s["name"], []).append(s["duration_ms"])
+
+    drift = components["llm"].stream.drift + components["tools"].stream.drift
+    return {
+        "wall_ms": 1000 * wall,
+        "graph_overhead_ms": max(0.0, 1000 * wall - sum(s["duration_ms"] for s in top_nodes)),
+        "node_ms": node_ms,
+        "steps": len(top_nodes),
+        "state_sizes": state_sizes,
+        "drift": drift
+    }
+
+def bench_mission(path: str, iterations: int) -> Dict:
+    cassette = Cassette.load(path)
+
+    # Aquecimento: imports, compilação do grafo e caches do Python.
+    asyncio.run(_run(cassette, 0))
+
+    runs = [asyncio.run(_run(cassette, i + 1)) for i in range(iterations)]
+    sized = asyncio.run(_run(cassette, iterations + 1, measure_state=True))
+
+    tracemalloc.start()
+    # Uma execução extra sob tracemalloc aquece caches internos que só existem com o rastreio ligado.
+    asyncio.run(_run(cassette, iterations + 2))
+    # Coleta antes de medir: senão o pico depende de quando o GC dispara, o que muda com o histórico de imports.
+    gc.collect()
+    snap_before = tracemalloc.take_snapshot()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    asyncio.run(_run(cassette, iterations + 3))
+    _, peak = tracemalloc.get_traced_memory()
+    peak -= current
+    snap_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    alloc_blocks = sum(max(0, stat.count_diff) for stat in snap_after.compare_to(snap_before, "lineno"))
+
+    node_ms: Dict[str, List[float]] = {}
+    for run in runs:
+        for node, values in run["node_ms"].items():
+            node_ms.setdefault(node, []).extend(values)
+
+    return {
+        "wall_ms_p50": round(statistics.median(r["wall_ms"] for r in runs), 3),
+        "graph_overhead_ms_p50": round(statistics.median(r["graph_overhead_ms"] for r in runs), 3),
+        "node_ms_p50": {node: round(statistics.median(v), 3) for node, v in sorted(node_ms.items())},
+        "steps": runs[0]["steps"],
+        "state_max_bytes": max(sized["state_sizes"] or [0]),
+        "state_final_bytes": (sized["state_sizes"] or [0])[-1],
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "alloc_blocks": alloc_blocks,
+        "replay_drift": runs[0]["drift"]
+    }
+
+def rerecord(path: str) -> int:
+    """
+    Atualiza a cassete com as requisições que o código atual faz (prompts, argumentos), mantendo as respostas gravadas.
+    Para quando um prompt muda sem alterar o fluxo da missão; mudanças de comportamento pedem gravação nova (record.py).
+    """
+    cassette = Cassette.load(path)
+    drift = asyncio.run(_run(cassette, 0, rerecord=True))["drift"]
+    cassette.save(path)
+    return drift
+
+def compare(results: Dict, baselines: Dict, time_tolerance: float, size_tolerance: float) -> List[str]:
+    regressions = []
+    for mission, metrics in results.items():
+        base = baselines.get(mission)
+        if not base:
+            continue
+        for key in TIME_METRICS + SIZE_METRICS:
+            if key not in base or key not in metrics:
+                continue
+            tolerance = time_tolerance if key in TIME_METRICS else size_tolerance
+            # Pequenas variações absolutas (< 1 ms / 1 unidade) não contam como regressão.
+            if metrics[key] > base[key] * tolerance and metrics[key] - base[key] > 1:
+                regressions.append(f"{mission}.{key}: {metrics[key]} > baseline {base[key]} (x{tolerance})")
+        for key in EXACT_METRICS:
+            if key in base and key in metrics and metrics[key] > base[key]:
+                regressions.append(f"{mission}.{key}: {metrics[key]} > baseline {base[key]}")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do grafo usando missões gravadas (sem modelo e sem rede).")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--mission", default="*", help="Filtro glob do nome da missão.")
+    parser.add_argument("--output", help="Grava os resultados em JSON neste caminho.")
+    parser.add_argument("--check", action="store_true", help="Falha (exit 1) se alguma métrica regredir em relação ao baseline.")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--rerecord", action="store_true", help="Regrava nas cassetes as requisições atuais (respostas mantidas) e sai.")
+    parser.add_argument("--time-tolerance", type=float, default=2.0)
+    parser.add_argument("--size-tolerance", type=float, default=1.15)
+    args = parser.parse_args()
+
+    tmp = _isolate_dirs()
+    if args.rerecord:
+        try:
+            for path in sorted(glob.glob(os.path.join(MISSIONS_DIR, f"{args.mission}.json"))):
+                print(f"{os.path.splitext(os.path.basename(path))[0]:<24} {rerecord(path)} requisições regravadas")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return 0
+
+    try:
+        results = {}
+        for path in sorted(glob.glob(os.path.join(MISSIONS_DIR, f"{args.mission}.json"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            results[name] = bench_mission(path, args.iterations)
+            r = results[name]
+            print(f"{name:<24} wall p50 {r['wall_ms_p50']:>8.2f} ms | overhead {r['graph_overhead_ms_p50']:>7.2f} ms | "
+                  f"{r['steps']:>3} passos | estado máx {r['state_max_bytes']:>7} B | pico {r['peak_alloc_kb']:>8.1f} KB | drift {r['replay_drift']}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline atualizado: {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baselines, args.time_tolerance, args.size_tolerance)
+    for line in regressions:
+        print(f"REGRESSÃO: {line}")
+    return 1 if (args.check and regressions) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
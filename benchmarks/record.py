@@ -0,0 +1,58 @@
+import os
+import sys
+import uuid
+import asyncio
+import argparse
+from core.replay import Cassette, recording_components
+
+MISSIONS_DIR = os.path.join(os.path.dirname(__file__), "missions")
+RECORD_READY_TIMEOUT = 600
+
+def build_initial_state(objective: str, mode: str = None) -> dict:
+    return {
+        "thread_id": f"record-{uuid.uuid4().hex[:8]}",
+        "objective": objective,
+        "status": "architecting",
+        "chat_history": [],
+        "completed_log": [],
+        "current_mode": mode or "task",
+        "agent_config": {"tools": {}},
+        "micro_task_queue": [],
+        "current_micro_task": "",
+        "last_tool_output": "",
+        "error_counter": 0
+    }
+
+async def record(name: str, objective: str) -> str:
+    from core.llm import LLMEngine
+    from tools.registry import ToolRegistry
+    from memory.manager import MemoryManager
+    from agents.nodes import TrebuchetNodes
+    from agents.workflow import TrebuchetOrchestrator
+
+    initial = build_initial_state(objective)
+    cassette = Cassette(name, dict(initial))
+    memory = MemoryManager.get_instance()
+    # A gravação precisa da recuperação real, não do contexto vazio devolvido enquanto a memória aquece.
+    if not memory.wait_ready(timeout=RECORD_READY_TIMEOUT):
+        print(f"[RECORD] Memória vetorial não ficou pronta ({memory.state}: {memory.warmup_error or 'tempo esgotado'}); gravação abortada.")
+        return ""
+    components = recording_components(cassette, LLMEngine(), ToolRegistry(), memory)
+    graph = TrebuchetOrchestrator(TrebuchetNodes(**components)).build()
+
+    async for event in graph.astream(initial):
+        for node in event:
+            print(f"[RECORD] {node}")
+
+    path = os.path.join(MISSIONS_DIR, f"{name}.json")
+    cassette.save(path)
+    print(f"[RECORD] {len(cassette.llm)} chamadas LLM, {len(cassette.tools)} ferramentas, {len(cassette.retrieval)} recuperações -> {path}")
+    return path
+
+if __name__ == "__main__":
+    # Uso: python -m benchmarks.record <nome> "<objetivo>"
+    parser = argparse.ArgumentParser(description="Grava uma missão real (LLM, ferramentas e memória) para replay determinístico.")
+    parser.add_argument("name")
+    parser.add_argument("objective")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(record(args.name, args.objective)) else 1)
@@ -0,0 +1,310 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import resource
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from core.config import Config
+
+# Vocabulário fixo: corpora reproduzíveis entre execuções (mesma semente, mesmos chunks e consultas).
+SYLLABLES = "ba be ca co da de fa fi ga go la le ma mo na ne pa po ra re sa so ta te va vo xa zu".split()
+WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in ("", "r", "s", "l", "do", "ção")][:5000]
+# Frequências em lei de Zipf, como em texto real (poucas palavras muito comuns, cauda longa de raras).
+CUM_WEIGHTS = list(np.cumsum([1.0 / rank for rank in range(1, len(WORDS) + 1)]))
+IDENTS = "load save parse build fetch merge split render index query route cache flush encode decode sync".split()
+THREAD_PREFIX = "bench-thread-"
+SAMPLE_SIZE = 2000
+
+class HashingEmbedder:
+    """Embedder fixo e barato (feature hashing de palavras, L2-normalizado): sem modelo, sem rede, só CPU."""
+    # Vetores esparsos de contagem ficam mais distantes que os de um modelo: um trecho de 7 palavras de um chunk de
+    # 20-40 fica a ~0,5-0,65 de distância do chunk, acima do limiar do embedder padrão (RETRIEVAL_SCORE_THRESHOLD).
+    SCORE_THRESHOLD = 0.8
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"bench-hashing-{dim}"
+
+    def _vector(self, text: str) -> List[float]:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+            v[h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(v)
+        return (v / norm if norm else v).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+# --- Corpus sintético ---
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=n))
+
+def _code(rng: random.Random, i: int) -> Dict:
+    name = f"{rng.choice(IDENTS)}_{rng.choice(IDENTS)}_{i}"
+    args = ", ".join(f"{rng.choice(WORDS)}_{j}" for j in range(rng.randint(1, 3)))
+    body = "\n".join(f"    {rng.choice(IDENTS)}_{rng.randint(0, 999)} = {rng.choice(IDENTS)}({rng.choice(WORDS)!r})" for _ in range(rng.randint(3, 8)))
+    content = f'def {name}({args}):\n    """{_sentence(rng, 12)}"""\n{body}\n    return {rng.choice(IDENTS)}_{i}\n'
+    return {"content": content, "source_type": "system_source_code", "thread_id": "system",
+            "metadata": {"filename": f"bench_{i}.py", "path": f"bench/bench_{i}.py"}}
+
+def _prose(rng: random.Random, i: int) -> Dict:
+    content = ". ".join(_sentence(rng, rng.randint(8, 16)).capitalize() for _ in range(rng.randint(3, 6))) + "."
+    return {"content": content, "source_type": "file_content", "thread_id": "system",
+            "metadata": {"filename": f"nota_{i}.md", "path": f"bench/nota_{i}.md"}}
+
+def _chat(rng: random.Random, i: int, threads: int) -> Dict:
+    role = rng.choice(("user", "assistant"))
+    return {"content": f"[{i}] {_sentence(rng, rng.randint(10, 40))}", "source_type": "chat_interaction",
+            "thread_id": f"{THREAD_PREFIX}{rng.randrange(threads)}", "metadata": {"role": role}}
+
+def corpus(rng: random.Random, start: int, count: int, mix: Dict[str, float], threads: int) -> Iterator[Dict]:
+    """Documentos de um chunk cada (abaixo do tamanho de chunk), sorteados conforme a proporção de cada tipo."""
+    kinds, weights = zip(*mix.items())
+    for i in range(start, start + count):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "code":
+            doc = _code(rng, i)
+        elif kind == "prose":
+            doc = _prose(rng, i)
+        else:
+            doc = _chat(rng, i, threads)
+        yield dict(doc, key=i, doc_id=f"bench-{i}")
+
+def _queries(rng: random.Random, samples: List[Tuple[str, str, str]], count: int, threads: int) -> List[Tuple[str, str, Tuple[str, str]]]:
+    """
+    (consulta, thread, (doc_id, conteúdo) do documento de origem) com trechos de documentos ingeridos (há resposta)
+    e um sufixo único, para não cair no cache de retrieve. A thread é a do documento quando é conversa; senão, uma
+    thread qualquer (documentos da thread system aparecem em todas).
+    """
+    queries = []
+    for i in range(count):
+        content, thread_id, doc_id = rng.choice(samples)
+        words = re.findall(r"\w+", content)
+        start = rng.randrange(max(1, len(words) - 6))
+        if not thread_id.startswith(THREAD_PREFIX):
+            thread_id = f"{THREAD_PREFIX}{rng.randrange(threads)}"
+        queries.append((" ".join(words[start:start + 6] + [f"q{i}"]), thread_id, (doc_id, content)))
+    return queries
+
+# --- Medições ---
+
+def _rss_mb() -> Tuple[float, float]:
+    """(RSS atual, pico de RSS) em MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+    current_mb = peak_mb
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current_mb = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return round(current_mb, 1), round(peak_mb, 1)
+
+def _disk_mb(path: str) -> float:
+    if os.path.isfile(path):
+        # Bancos SQLite em WAL: conta também os arquivos -wal e -shm.
+        return round(sum(os.path.getsize(p) for p in (path, path + "-wal", path + "-shm") if os.path.exists(p)) / (1024 * 1024), 2)
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return round(total / (1024 * 1024), 2)
+
+def _percentiles(samples: List[float]) -> Dict:
+    ms = np.array(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "mean_ms": round(float(ms.mean()), 3)}
+
+def _timed(fn, queries: List[Tuple]) -> Tuple[List[float], List]:
+    latencies, outputs = [], []
+    for query, thread_id, _ in queries:
+        start = time.perf_counter()
+        outputs.append(fn(query, thread_id))
+        latencies.append(time.perf_counter() - start)
+    return latencies, outputs
+
+def _recall(hits: List[bool]) -> float:
+    return round(sum(hits) / len(hits), 4) if hits else 0.0
+
+def measure_queries(memory, queries: List[Tuple], k: int) -> Dict:
+    """Latência e recall@k (fração das consultas cujo documento de origem está entre os k primeiros resultados)."""
+    store = memory.vector_store
+    candidates = k * Config.RETRIEVAL_CANDIDATES
+    sources = [source for _, _, source in queries]
+    results = {}
+
+    # _retrieve é o caminho sem cache (busca densa + léxica + fusão); devolve também se coube no orçamento.
+    # O contexto não traz ids: o documento de origem (um chunk só) é procurado pelo conteúdo.
+    for label, filtered in (("retrieve", False), ("retrieve_thread", True)):
+        latencies, outputs = _timed(lambda q, t: memory._retrieve(q, k=k, thread_id=t if filtered else None), queries)
+        results[label] = dict(
+            _percentiles(latencies), over_budget=sum(1 for _, complete in outputs if not complete),
+            recall=_recall([content.strip() in context for (context, _), (_, content) in zip(outputs, sources)])
+        )
+
+    for label, fn in (
+        ("dense", lambda q, t: store.search(q, candidates)),
+        ("dense_thread", lambda q, t: store.search(q, candidates, thread_id=t)),
+        ("lexical", lambda q, t: store.lexical_search(q, candidates)),
+        ("lexical_thread", lambda q, t: store.lexical_search(q, candidates, thread_id=t)),
+    ):
+        latencies, outputs = _timed(fn, queries)
+        results[label] = dict(
+            _percentiles(latencies), empty=sum(1 for hits in outputs if not hits),
+            recall=_recall([any(hit["id"].startswith(f"{doc_id}_") for hit in hits[:k]) for hits, (doc_id, _) in zip(outputs, sources)])
+        )
+    return results
+
+def _isolate_dirs(root: str):
+    for key in ("knowledge", "cache", "logs"):
+        Config.DIRS[key] = os.path.join(root, key)
+    Config.DIRS["chroma"] = os.path.join(root, "knowledge", "chroma_db")
+    Config.DIRS["episodic"] = os.path.join(root, "knowledge", "episodes")
+    for key in ("knowledge", "cache", "logs", "chroma", "episodic"):
+        os.makedirs(Config.DIRS[key], exist_ok=True)
+
+def _build_memory(dim: int):
+    from memory.episodic import EpisodicStore
+    from memory.text_index import TextIndex
+    from memory.manager import MemoryManager, VectorStoreAdapter
+
+    # Singletons apontariam para os diretórios de uma execução anterior.
+    EpisodicStore._instance = None
+    TextIndex._instance = None
+    memory = MemoryManager(vector_store=VectorStoreAdapter(Config.DIRS["chroma"], embedder=HashingEmbedder(dim)), sync=False)
+    if not memory.wait_ready(60):
+        raise RuntimeError(f"memória vetorial não ficou pronta ({memory.state}: {memory.warmup_error})")
+    return memory
+
+def run(sizes: List[int], queries: int, k: int, dim: int, threads: int, mix: Dict[str, float], batch: int,
+        seed: int, workdir: Optional[str] = None, score_threshold: float = HashingEmbedder.SCORE_THRESHOLD) -> Dict:
+    """Ingere o corpus de forma cumulativa e mede em cada tamanho pedido (10k, depois +90k até 100k, ...)."""
+    root = workdir or tempfile.mkdtemp(prefix="trebuchet-vsbench-")
+    Config.RETRIEVAL_SCORE_THRESHOLD = score_threshold
+    _isolate_dirs(root)
+    rng = random.Random(seed)
+    sampler = random.Random(seed + 1)
+    memory = _build_memory(dim)
+
+    results = []
+    ingested = stored = 0
+    samples: List[Tuple[str, str, str]] = []
+    try:
+        for target in sorted(sizes):
+            start = time.perf_counter()
+            before = stored
+            while ingested < target:
+                count = min(batch, target - ingested)
+                docs = list(corpus(rng, ingested, count, mix, threads))
+                # Amostragem de reservatório: as consultas saem de todo o corpus ingerido até aqui, não só do começo.
+                for n, doc in enumerate(docs, start=ingested):
+                    sample = (doc["content"], doc["thread_id"], doc["doc_id"])
+                    if len(samples) < SAMPLE_SIZE:
+                        samples.append(sample)
+                    elif sampler.randrange(n + 1) < SAMPLE_SIZE:
+                        samples[sampler.randrange(SAMPLE_SIZE)] = sample
+                stored += sum(len(ids) for ids in memory.ingest_many(docs, report=False).values())
+                ingested += count
+            elapsed = time.perf_counter() - start
+            memory.vector_store.embedder.save()
+
+            query_set = _queries(rng, samples, queries, threads)
+            rss, peak = _rss_mb()
+            result = {
+                "documents": ingested,
+                "chunks": stored,
+                "ingest": {"chunks": stored - before, "seconds": round(elapsed, 3),
+                           "chunks_per_sec": round((stored - before) / elapsed, 1) if elapsed else 0.0},
+                "query": measure_queries(memory, query_set, k),
+                "shards": memory.vector_store.shard_stats(),
+                "memory_mb": {"rss": rss, "peak_rss": peak},
+                "disk_mb": {
+                    "chroma": _disk_mb(Config.DIRS["chroma"]),
+                    "lexical_index": _disk_mb(memory.vector_store.lexical.path),
+                    "dedup_index": _disk_mb(memory.vector_store.dedup.path),
+                    "episodes": _disk_mb(Config.DIRS["episodic"]),
+                    "embedding_cache": _disk_mb(memory.vector_store.embedder.cache_dir),
+                    "total": _disk_mb(root)
+                }
+            }
+            results.append(result)
+            q = result["query"]
+            print(f"{stored:>9} chunks | ingest {result['ingest']['chunks_per_sec']:>8.1f} chunks/s | "
+                  f"retrieve p50 {q['retrieve']['p50_ms']:>7.2f} p99 {q['retrieve']['p99_ms']:>7.2f} ms | "
+                  f"c/ thread p50 {q['retrieve_thread']['p50_ms']:>7.2f} p99 {q['retrieve_thread']['p99_ms']:>7.2f} ms | "
+                  f"recall@{k} {q['retrieve']['recall']:.2f}/{q['retrieve_thread']['recall']:.2f} | "
+                  f"RSS {rss:>7.1f} MB | disco {result['disk_mb']['total']:>8.2f} MB")
+    finally:
+        # Grava o cache de embeddings antes de apagar o diretório (senão o atexit tenta gravar num caminho que sumiu).
+        memory.vector_store.embedder.save()
+        memory.search_pool.shutdown(wait=False)
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "config": {"sizes": sorted(sizes), "queries": queries, "k": k, "dim": dim, "threads": threads, "mix": mix,
+                   "batch": batch, "seed": seed, "shard_chat_by_thread": Config.SHARD_CHAT_BY_THREAD,
+                   "retrieval_budget_ms": Config.RETRIEVAL_BUDGET_MS, "chunk_length_mode": Config.CHUNK_LENGTH_MODE,
+                   "score_threshold": Config.RETRIEVAL_SCORE_THRESHOLD},
+        "results": results
+    }
+
+def _parse_size(value: str) -> int:
+    value = value.strip().lower()
+    factor = {"k": 1000, "m": 1000000}.get(value[-1:], 1)
+    return int(float(value[:-1] if factor > 1 else value) * factor)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark da memória vetorial com corpus sintético (só CPU, embedder fixo por hashing).")
+    parser.add_argument("--sizes", default="10k", help="Tamanhos em documentos, separados por vírgula (ex.: 10k,100k,1m).")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--threads", type=int, default=50, help="Número de conversas sintéticas.")
+    parser.add_argument("--mix", default="code=0.4,prose=0.3,chat=0.3")
+    parser.add_argument("--batch", type=int, default=1000, help="Documentos por chamada a ingest_many.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--shard-by-thread", action="store_true", help="Liga SHARD_CHAT_BY_THREAD.")
+    parser.add_argument("--chunk-mode", choices=("chars", "tokens"), default="chars",
+                        help="tokens usa o tokenizador do embedder (arquivo local ou download); chars é determinístico e offline.")
+    parser.add_argument("--score-threshold", type=float, default=HashingEmbedder.SCORE_THRESHOLD,
+                        help="Distância de cosseno máxima da busca densa; o padrão é calibrado para o embedder por hashing.")
+    parser.add_argument("--workdir", help="Mantém os dados gerados neste diretório em vez de um temporário.")
+    parser.add_argument("--output", help="Grava o resultado em JSON neste caminho.")
+    args = parser.parse_args()
+
+    mix = {kind: float(weight) for kind, weight in (part.split("=") for part in args.mix.split(","))}
+    if args.shard_by_thread:
+        Config.SHARD_CHAT_BY_THREAD = True
+    Config.CHUNK_LENGTH_MODE = args.chunk_mode
+
+    result = run([_parse_size(s) for s in args.sizes.split(",")], args.queries, args.k, args.dim,
+                 args.threads, mix, args.batch, args.seed, args.workdir, args.score_threshold)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
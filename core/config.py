@@ -35,6 +35,94 @@ class Config:
     
     CONTEXT_SIZE = 8096
 
+    STATE_LOG_LIMIT = 30
+    STATE_HISTORY_LIMIT = 20
+    STEPLOG_CHECKPOINT_EVERY = 20
+    STEPLOG_CACHED_THREADS = 256
+    TOOL_OUTPUT_PREVIEW = 500
+    BLOB_PAGE_SIZE = 2000
+
+    HISTORY_RECENT_MESSAGES = 6
+    SUMMARY_MAX_WORDS = 200
+    SUMMARY_MESSAGE_CHARS = 2000
+
+    COMPRESSION_THRESHOLD = 1500
+    COMPRESSION_MAX_LINES = 40
+    COMPRESSION_CACHE_SIZE = 1024
+    COMPRESSION_CACHE_SAVE_INTERVAL = 30
+    # Ferramentas cuja saída já é uma página de blob: voltam inteiras ao prompt, sem preview nem compressão.
+    UNCOMPRESSED_TOOLS = ["read_blob"]
+
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND = "onnx"
+    ONNX_EMBEDDING_FILE = "onnx/model_quint8_avx2.onnx"
+    EMBED_THREADS = 2
+    EMBED_MAX_TOKENS = 256
+    EMBED_BATCH_TOKENS = 8192
+    EMBED_CACHE_MEMORY_ITEMS = 4096
+    EMBED_CACHE_DISK_MB = 256
+    EMBED_CACHE_DTYPE = "float16"
+    EMBED_CACHE_SAVE_INTERVAL = 30
+    INGEST_BATCH_SIZE = 64
+    INGEST_QUEUE_SIZE = 256
+    INGEST_FLUSH_DOCS = 32
+    INGEST_FLUSH_INTERVAL = 2.0
+    SYNC_WORKERS = 4
+    SYNC_READ_BATCH = 64
+    CHUNK_LENGTH_MODE = "tokens"
+    CHUNK_TOKENS = 256
+    CHUNK_TOKEN_OVERLAP = 32
+    SPLIT_WORKERS = 2
+    SPLIT_MIN_DOCS = 512
+    RECONCILE_INTERVAL = 3600
+    MEMORY_WARMUP_ATTEMPTS = 3
+    MEMORY_WARMUP_RETRY_DELAY = 10
+    EPISODIC_SEGMENT_ROWS = 100000
+    SEARCH_SNIPPET_TOKENS = 16
+    RETRIEVAL_WORKERS = 4
+    RETRIEVAL_CANDIDATES = 3
+    RETRIEVAL_BUDGET_MS = 300
+    RETRIEVAL_CACHE_SIZE = 512
+    # Distância de cosseno máxima de um resultado da busca densa (calibrada para o embedder padrão).
+    RETRIEVAL_SCORE_THRESHOLD = 0.4
+    # Domínios que cada modo consulta (None = todos): a conversa dispensa o raciocínio interno do planejador.
+    # True restringe a recuperação à thread da missão (mais a base de conhecimento, thread "system").
+    RETRIEVAL_THREAD_SCOPED = False
+    RETRIEVAL_DOMAINS = {"chat": ["general", "code", "web", "knowledge", "notion", "system"], "task": None}
+    MEMORY_SHARDS = ["code", "web", "knowledge", "notion", "system", "internal_thought", "general"]
+    SHARD_CHAT_BY_THREAD = False
+    SHARD_WORKERS = 4
+    DEDUP_ENABLED = True
+    DEDUP_MAX_HAMMING = 5
+    DEDUP_MIN_CHARS = 80
+    SHARD_COMPACT_RATIO = 0.25
+    SHARD_HNSW = {
+        "default": {"hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 64},
+        "code": {"hnsw:M": 32, "hnsw:construction_ef": 200, "hnsw:search_ef": 100},
+        "knowledge": {"hnsw:M": 32, "hnsw:construction_ef": 200, "hnsw:search_ef": 100},
+        "thread": {"hnsw:M": 8, "hnsw:construction_ef": 64, "hnsw:search_ef": 32}
+    }
+    TOOL_SHORTLIST_K = 6
+    TOOL_ALWAYS_INCLUDE = ["read_blob", "tool_editor"]
+
+    # Modo classificado por thread, reaproveitado nas mensagens seguintes (até MODE_CACHE_TURNS vezes). Um "chat"
+    # guardado não vale para mensagem com cara de tarefa (MODE_TASK_HINTS): essa volta ao classificador.
+    MODE_CACHE_SIZE = 256
+    MODE_CACHE_TURNS = 3
+    MODE_TASK_HINTS = (
+        r"https?://|```|[\w.-]+/[\w./-]+|\.(py|js|ts|json|csv|md|txt|pdf|sh)\b|"
+        r"\b(crie|criar|execute|executar|rode|rodar|instale|instalar|baixe|baixar|abra|abrir|pesquise|pesquisar|busque|"
+        r"buscar|procure|escreva|escrever|edite|editar|liste|listar|compare|comparar|analise|analisar|corrija|corrigir|"
+        r"envie|enviar|agende|agendar|gere|gerar|leia|ler|salve|salvar|apague|apagar|"
+        r"run|create|install|download|open|search|find|write|edit|list|compare|analy[sz]e|fix|send|schedule|generate|read|save|delete)\b"
+    )
+
+    MAX_SUBAGENTS = 5
+    # Sub-agentes simultâneos por slot de inferência: um no modelo e outro executando ferramentas enquanto espera.
+    SUBAGENTS_PER_SLOT = 2
+    SUBAGENT_TIMEOUT = 300
+    SUBAGENT_RECURSION_LIMIT = 25
+
     DRY_RUN = False 
     KILL_SWITCH = False
     
@@ -42,6 +130,15 @@ class Config:
 
     API_HOST = "0.0.0.0"
     API_PORT = 8001
+    API_TRUSTED_PROXIES = []
+
+    TRACING_ENABLED = True
+    TRACE_MAX_BYTES = 10 * 1024 * 1024
+    TRACE_BACKUPS = 3
+
+    MISSION_WORKERS = 2
+    MISSION_QUEUE_SIZE = 32
+    MISSION_CLIENT_QUOTA = 4
 
 for d in Config.DIRS.values():
     os.makedirs(d, exist_ok=True)
@@ -0,0 +1,90 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+class InferenceScheduler:
+    """
+    Fila única de inferência do processo. O llama_cpp não aceita chamadas concorrentes no mesmo modelo e o LLMEngine
+    tem um só worker, então há um único slot: UI, API e sub-agentes (em qualquer event loop) esperam aqui e o tempo
+    de espera fica contabilizado. A fila atende por prioridade e, dentro dela, por ordem de chegada; trabalho de
+    fundo (PRIORITY_BACKGROUND, ex.: resumo da conversa) só pega o slot quando não há chamada interativa esperando.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, slots: int = 1):
+        self.slots = slots
+        self.in_use = 0
+        self.total_requests = 0
+        self.total_wait = 0.0
+        self._state_lock = threading.Lock()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def available(self) -> int:
+        with self._state_lock:
+            return max(0, self.slots - self.in_use)
+
+    async def _acquire(self, priority: int):
+        loop = asyncio.get_running_loop()
+        with self._state_lock:
+            if self.in_use < self.slots and not self._waiters:
+                self.in_use += 1
+                return
+            waiter = loop.create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), loop, waiter))
+        # Cancelado ainda na fila, o waiter é descartado por _release; se o slot já tinha sido repassado a ele,
+        # _wake o devolve ao ver o future cancelado.
+        await waiter
+
+    def _release(self):
+        # O slot passa direto para o próximo da fila (in_use não muda), acordando-o no loop dele.
+        with self._state_lock:
+            while self._waiters:
+                _, _, loop, waiter = heapq.heappop(self._waiters)
+                if not waiter.done() and not loop.is_closed():
+                    loop.call_soon_threadsafe(self._wake, waiter)
+                    return
+            self.in_use -= 1
+
+    def _wake(self, waiter: asyncio.Future):
+        if waiter.done():
+            # Cancelado entre o repasse e a execução deste callback.
+            self._release()
+        else:
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        start = time.perf_counter()
+        await self._acquire(priority)
+        with self._state_lock:
+            self.total_requests += 1
+            self.total_wait += time.perf_counter() - start
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        with self._state_lock:
+            return {
+                "slots": self.slots,
+                "in_use": self.in_use,
+                "waiting": sum(1 for *_, waiter in self._waiters if not waiter.done()),
+                "total_requests": self.total_requests,
+                "avg_wait_ms": round(1000 * self.total_wait / self.total_requests, 2) if self.total_requests else 0.0
+            }
@@ -1,15 +1,18 @@
 import os
-import sys
 import asyncio
+import time
 from typing import List, Dict
 from concurrent.futures import ThreadPoolExecutor
 from core.config import Config
+from core.inference import InferenceScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from core.tracing import Tracer
 
 try:
     from llama_cpp import Llama
 except ImportError:
+    # Sem llama_cpp o engine sobe em modo "modelo ausente"; o modo replay (core/replay.py) não precisa dele.
     print("CRITICAL: Biblioteca 'llama_cpp' não encontrada. Instale com: pip install llama-cpp-python")
-    sys.exit(1)
+    Llama = None
 
 class LLMEngine:
     _instance = None
@@ -27,7 +30,7 @@ class LLMEngine:
         print("[LLM] Inicializando Engine...")
         model_path = os.path.join(Config.DIRS["models"], Config.MAIN_FILE)
         
-        if not os.path.exists(model_path):
+        if Llama is None or not os.path.exists(model_path):
             print(f"❌ Modelo não encontrado em: {model_path}")
             self.model_missing = True
         else:
@@ -48,24 +51,66 @@ class LLMEngine:
                 vocab_only=False
             )
         
+        self.fast_llm = None
+        self._fast_resolved = False
+        # Um único worker: o llama_cpp não é reentrante. O InferenceScheduler enfileira as chamadas de todo o processo.
         self.executor = ThreadPoolExecutor(max_workers=1)
+        self.scheduler = InferenceScheduler.get_instance()
         self._initialized = True
 
-    async def chat(self, messages: List[Dict], temperature: float = 0.7) -> str:
-        if self.model_missing:
+    def _load_fast_model(self):
+        # A resolução (modelo rápido, fallback para o principal ou nenhum) acontece uma vez só.
+        if self._fast_resolved:
+            return self.fast_llm
+        self._fast_resolved = True
+
+        fast_path = os.path.join(Config.DIRS["models"], Config.FAST_FILE)
+        if Llama is None or not os.path.exists(fast_path):
+            print(f"[LLM] Modelo rápido não encontrado em: {fast_path}. Usando o modelo principal.")
+            self.fast_llm = self.llm if not self.model_missing else None
+            return self.fast_llm
+
+        print("[LLM] Carregando modelo rápido...")
+        self.fast_llm = Llama(
+            model_path=fast_path,
+            n_ctx=Config.CONTEXT_SIZE,
+            n_gpu_layers=-1,
+            verbose=False,
+            n_batch=512,
+            chat_format="chatml",
+            use_mmap=True,
+            n_threads=4,
+            seed=42
+        )
+        return self.fast_llm
+
+    async def chat(self, messages: List[Dict], temperature: float = 0.7, fast: bool = False, max_tokens: int = 4096,
+                   background: bool = False) -> str:
+        if self.model_missing and not fast:
             return "ERRO: Modelo não encontrado. Verifique o caminho no config.py."
 
         loop = asyncio.get_running_loop()
+        usage = {}
         
         def _run_inference():
             try:
-                response = self.llm.create_chat_completion(
+                model = self._load_fast_model() if fast else self.llm
+                if model is None:
+                    return "ERRO: Modelo não encontrado. Verifique o caminho no config.py."
+                response = model.create_chat_completion(
                     messages=messages,
                     temperature=temperature,
-                    max_tokens=4096
+                    max_tokens=max_tokens
                 )
+                usage.update(response.get("usage") or {})
                 return response["choices"][0]["message"]["content"]
             except Exception as e:
                 return f"Error generating response: {str(e)}"
 
-        return await loop.run_in_executor(self.executor, _run_inference)
\ No newline at end of file
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        with Tracer.get_instance().span("chat", kind="llm", model="fast" if fast else "main", chars=prompt_chars) as span:
+            async with self.scheduler.slot(PRIORITY_BACKGROUND if background else PRIORITY_INTERACTIVE):
+                span.set(queued_ms=round(1000 * (time.time() - span.start), 3))
+                result = await loop.run_in_executor(self.executor, _run_inference)
+            span.set(tokens_in=usage.get("prompt_tokens"), tokens_out=usage.get("completion_tokens"), output_chars=len(result))
+            return result
\ No newline at end of file
@@ -0,0 +1,171 @@
+import re
+import json
+import hashlib
+import asyncio
+from typing import Dict, List, Optional
+from core.inference import InferenceScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+CASSETTE_VERSION = 1
+
+# Data/hora embutida nos prompts (ex.: chat_mode) não faz parte da requisição para fins de replay.
+TIMESTAMP_PATTERN = re.compile(r"\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}")
+
+def request_hash(payload) -> str:
+    text = TIMESTAMP_PATTERN.sub("<DATA/HORA>", json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+class ReplayMiss(Exception):
+    pass
+
+class Cassette:
+    """Gravação de uma missão: requisições/respostas do LLM, resultados de ferramentas e da recuperação, em ordem."""
+
+    def __init__(self, name: str = "mission", initial_state: Dict = None):
+        self.name = name
+        self.initial_state = initial_state or {}
+        self.llm: List[Dict] = []
+        self.tools: List[Dict] = []
+        self.retrieval: List[Dict] = []
+        self.tool_prompt = ""
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": CASSETTE_VERSION,
+            "name": self.name,
+            "initial_state": self.initial_state,
+            "llm": self.llm,
+            "tools": self.tools,
+            "retrieval": self.retrieval,
+            "tool_prompt": self.tool_prompt
+        }
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        cassette = cls(data.get("name", "mission"), data.get("initial_state", {}))
+        cassette.llm = data.get("llm", [])
+        cassette.tools = data.get("tools", [])
+        cassette.retrieval = data.get("retrieval", [])
+        cassette.tool_prompt = data.get("tool_prompt", "")
+        return cassette
+
+class RecordingLLM:
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.scheduler = inner.scheduler
+
+    async def chat(self, messages: List[Dict], temperature: float = 0.7, fast: bool = False, max_tokens: int = 4096,
+                   background: bool = False) -> str:
+        response = await self.inner.chat(messages=messages, temperature=temperature, fast=fast, max_tokens=max_tokens, background=background)
+        self.cassette.llm.append({
+            "hash": request_hash([messages, fast]),
+            "fast": fast,
+            "temperature": temperature,
+            "messages": messages,
+            "response": response
+        })
+        return response
+
+class RecordingTools:
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.tools = inner.tools
+
+    def get_prompt_list(self, *args, **kwargs) -> str:
+        self.cassette.tool_prompt = self.inner.get_prompt_list(*args, **kwargs)
+        return self.cassette.tool_prompt
+
+    def execute(self, tool_name: str, args: Dict) -> Dict:
+        result = self.inner.execute(tool_name, args)
+        self.cassette.tools.append({"hash": request_hash([tool_name, args]), "tool": tool_name, "args": args, "result": result})
+        return result
+
+class RecordingMemory:
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def retrieve(self, query: str, k: int = 5, thread_id: Optional[str] = None, domains: Optional[List[str]] = None) -> str:
+        context = self.inner.retrieve(query, k=k, thread_id=thread_id, domains=domains)
+        self.cassette.retrieval.append({"hash": request_hash([query, k, thread_id, domains]), "query": query, "k": k, "result": context})
+        return context
+
+class _ReplayStream:
+    """
+    Serve as entradas gravadas em ordem; divergências de hash (prompt ou argumentos diferentes dos gravados) são
+    contadas como drift, não fatais. Com rerecord, cada entrada servida passa a guardar a requisição atual.
+    """
+
+    def __init__(self, entries: List[Dict], kind: str, rerecord: bool = False):
+        self.entries = entries
+        self.kind = kind
+        self.rerecord = rerecord
+        self.cursor = 0
+        self.drift = 0
+
+    def next(self, current_hash: str, **request) -> Dict:
+        if self.cursor >= len(self.entries):
+            raise ReplayMiss(f"Replay sem mais respostas de '{self.kind}' (consumidas {self.cursor}).")
+        entry = self.entries[self.cursor]
+        self.cursor += 1
+        if entry.get("hash") and entry["hash"] != current_hash:
+            self.drift += 1
+            if self.rerecord:
+                entry.update(request, hash=current_hash)
+        return entry
+
+class ReplayLLM:
+    def __init__(self, cassette: Cassette, latency: float = 0.0, rerecord: bool = False):
+        # Chamadas ao modelo rápido ficam em outro fluxo: o cache de resumos pode pular algumas delas.
+        self.stream = _ReplayStream([e for e in cassette.llm if not e.get("fast")], "llm", rerecord)
+        self.fast_stream = _ReplayStream([e for e in cassette.llm if e.get("fast")], "llm_fast", rerecord)
+        self.latency = latency
+        self.scheduler = InferenceScheduler.get_instance()
+
+    async def chat(self, messages: List[Dict], temperature: float = 0.7, fast: bool = False, max_tokens: int = 4096,
+                   background: bool = False) -> str:
+        async with self.scheduler.slot(PRIORITY_BACKGROUND if background else PRIORITY_INTERACTIVE):
+            stream = self.fast_stream if fast else self.stream
+            entry = stream.next(request_hash([messages, fast]), messages=messages)
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return entry["response"]
+
+class ReplayTools:
+    def __init__(self, cassette: Cassette, rerecord: bool = False):
+        self.stream = _ReplayStream(cassette.tools, "tools", rerecord)
+        self.prompt_list = cassette.tool_prompt or "FERRAMENTAS DISPONÍVEIS:\n"
+        self.tools = {}
+
+    def get_prompt_list(self, *args, **kwargs) -> str:
+        return self.prompt_list
+
+    def execute(self, tool_name: str, args: Dict) -> Dict:
+        return self.stream.next(request_hash([tool_name, args]), tool=tool_name, args=args)["result"]
+
+class ReplayMemory:
+    def __init__(self, cassette: Cassette, rerecord: bool = False):
+        self.stream = _ReplayStream(cassette.retrieval, "retrieval", rerecord)
+
+    def retrieve(self, query: str, k: int = 5, thread_id: Optional[str] = None, domains: Optional[List[str]] = None) -> str:
+        if not self.stream.entries:
+            return ""
+        return self.stream.next(request_hash([query, k, thread_id, domains]), query=query, k=k)["result"]
+
+def replay_components(cassette: Cassette, latency: float = 0.0, rerecord: bool = False) -> Dict:
+    """Componentes de replay. rerecord=True atualiza na cassete as requisições que divergiram (respostas mantidas)."""
+    return {
+        "llm": ReplayLLM(cassette, latency, rerecord),
+        "tools": ReplayTools(cassette, rerecord),
+        "memory": ReplayMemory(cassette, rerecord)
+    }
+
+def recording_components(cassette: Cassette, llm, tools, memory) -> Dict:
+    return {"llm": RecordingLLM(llm, cassette), "tools": RecordingTools(tools, cassette), "memory": RecordingMemory(memory, cassette)}
@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+from core.config import Config
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("trebuchet_span", default=None)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end", "attrs", "status", "_token")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attrs: Dict):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end = None
+        self.attrs = attrs
+        self.status = "ok"
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": round(1000 * ((self.end or time.time()) - self.start), 3),
+            "status": self.status,
+            "attrs": self.attrs
+        }
+
+class Tracer:
+    """Spans com relação pai/filho para nós do grafo, chamadas de LLM, recuperação e ferramentas, gravados em JSONL rotativo."""
+    _instance = None
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(Config.DIRS["logs"], "traces.jsonl")
+        self.enabled = Config.TRACING_ENABLED
+        self._listeners = []
+        self._logger = logging.getLogger("trebuchet.trace")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(self.path, maxBytes=Config.TRACE_MAX_BYTES, backupCount=Config.TRACE_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def start(self, name: str, kind: str = "internal", trace_id: Optional[str] = None, **attrs) -> Span:
+        parent = _current_span.get()
+        if parent is not None:
+            trace_id = parent.trace_id
+        span = Span(name, kind, trace_id or uuid.uuid4().hex, parent.span_id if parent else None, attrs)
+        span._token = _current_span.set(span)
+        return span
+
+    def finish(self, span: Span, error: Optional[BaseException] = None):
+        span.end = time.time()
+        if error is not None:
+            span.status = "error"
+            span.attrs["error"] = f"{type(error).__name__}: {error}"
+        try:
+            _current_span.reset(span._token)
+        except ValueError:
+            # Finalizado em outro contexto (ex.: callback); apenas não restaura o pai.
+            pass
+        record = span.to_dict()
+        for listener in self._listeners:
+            listener(record)
+        if self.enabled:
+            self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", trace_id: Optional[str] = None, **attrs):
+        span = self.start(name, kind, trace_id, **attrs)
+        try:
+            yield span
+        except BaseException as e:
+            self.finish(span, e)
+            raise
+        else:
+            self.finish(span)
+
+def load_spans(path: Optional[str] = None, trace_id: Optional[str] = None) -> List[Dict]:
+    path = path or os.path.join(Config.DIRS["logs"], "traces.jsonl")
+    files = [f"{path}.{i}" for i in range(Config.TRACE_BACKUPS, 0, -1)] + [path]
+    spans = []
+    for fpath in files:
+        if not os.path.exists(fpath):
+            continue
+        with open(fpath, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if trace_id is None or span["trace_id"].startswith(trace_id):
+                    spans.append(span)
+    return spans
+
+def render_waterfall(spans: List[Dict], width: int = 50) -> str:
+    if not spans:
+        return "Nenhum span encontrado."
+
+    spans = sorted(spans, key=lambda s: s["start"])
+    t0 = spans[0]["start"]
+    t1 = max(s["start"] + s["duration_ms"] / 1000 for s in spans)
+    total = max(t1 - t0, 1e-6)
+
+    by_id = {s["span_id"]: s for s in spans}
+    def depth(span: Dict) -> int:
+        d, parent = 0, span.get("parent_id")
+        while parent in by_id and d < 20:
+            d, parent = d + 1, by_id[parent].get("parent_id")
+        return d
+
+    lines = [f"trace {spans[0]['trace_id']} | {len(spans)} spans | {total * 1000:.0f} ms"]
+    for s in spans:
+        offset = int(width * (s["start"] - t0) / total)
+        length = max(1, int(width * s["duration_ms"] / 1000 / total))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = f"{'  ' * depth(s)}{s['kind']}:{s['name']}"
+        extra = " ".join(f"{k}={v}" for k, v in s["attrs"].items() if k in ("tokens_in", "tokens_out", "chars", "output_chars", "success", "error"))
+        flag = " !" if s["status"] == "error" else ""
+        lines.append(f"{label[:38]:<38} |{bar:<{width}}| {s['duration_ms']:>9.1f} ms{flag} {extra}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # Uso: python -m core.tracing            -> lista missões recentes
+    #      python -m core.tracing <trace_id> -> desenha o waterfall da missão
+    if len(sys.argv) > 1:
+        print(render_waterfall(load_spans(trace_id=sys.argv[1])))
+    else:
+        traces: Dict[str, Dict] = {}
+        for s in load_spans():
+            t = traces.setdefault(s["trace_id"], {"start": s["start"], "spans": 0, "root": None})
+            t["spans"] += 1
+            t["start"] = min(t["start"], s["start"])
+            if s["parent_id"] is None:
+                t["root"] = f"{s['kind']}:{s['name']} ({s['duration_ms']:.0f} ms)"
+        for tid, t in sorted(traces.items(), key=lambda kv: kv[1]["start"])[-20:]:
+            ts = time.strftime("%d/%m %H:%M:%S", time.localtime(t["start"]))
+            print(f"{ts}  {tid}  {t['spans']:>4} spans  {t['root']}")
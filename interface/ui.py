@@ -9,9 +9,12 @@ import uuid
 import glob
 import logging
 import queue
+import threading
 from datetime import datetime
 from tools.registry import ToolRegistry
-from memory.manager import MemoryManager
+from memory.ingest_queue import IngestQueue
+from memory.text_index import TextIndex
+from core.tracing import Tracer
 
 sys_log_queue = queue.Queue()
 
@@ -68,12 +71,27 @@ logging.getLogger().setLevel(logging.INFO)
 
 HISTORY_DIR = Path(r"E:\Trebuchet\knowledge\chats")
 HISTORY_DIR.mkdir(exist_ok=True)
+# Conversas salvas antes do índice full-text (ou editadas fora da UI) entram em segundo plano.
+threading.Thread(target=TextIndex.get_instance().index_chat_dir, args=(str(HISTORY_DIR),), daemon=True).start()
 UPLOAD_DIR = Path(r"E:\Trebuchet\temp")
 if not UPLOAD_DIR.parent.exists():
     UPLOAD_DIR = Path("temp")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 tool_registry = ToolRegistry()
+_workflow = None
+
+def get_workflow():
+    """Grafo compilado uma vez e reaproveitado por todas as mensagens, com o mesmo registro de ferramentas da UI."""
+    global _workflow
+    if _workflow is None:
+        from agents.nodes import TrebuchetNodes
+        from agents.workflow import TrebuchetOrchestrator
+        _workflow = TrebuchetOrchestrator(TrebuchetNodes(tools=tool_registry)).build()
+    return _workflow
+
+# Conversas com atualização de resumo em andamento: no máximo uma por conversa, mesmo com a página aberta duas vezes.
+SUMMARIES_RUNNING = set()
 app.add_static_files('/public', 'public')
 
 C_BG_MAIN = '#09090b'
@@ -232,12 +250,15 @@ async def main_page():
     session = {
         "running": False,
         "history": [],
+        "summary": "",
+        "summary_upto": 0,
         "attachments": [],
         "config": {
             "tools": {},
             "model": "Qwen/Qwen2.5-Coder-3B-Instruct-GGUF",
             "temperature": 0.7,
-            "max_steps": 10
+            "max_steps": 10,
+            "mode": "auto"
         }
     }
     
@@ -295,12 +316,19 @@ async def main_page():
             "title": title,
             "timestamp": datetime.now().isoformat(),
             "messages": session["history"],
+            "summary": session["summary"],
+            "summary_upto": session["summary_upto"],
             "config": session["config"]
         }
         
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
         
+        try:
+            TextIndex.get_instance().index_chat(current_chat_id, session["history"], mtime=filepath.stat().st_mtime)
+        except Exception as e:
+            print(f"[MEMORY] Falha ao indexar conversa: {e}")
+        
         refresh_history_sidebar() 
 
    
@@ -315,6 +343,8 @@ async def main_page():
             
             current_chat_id = data["id"]
             session["history"] = data["messages"]
+            session["summary"] = data.get("summary", "")
+            session["summary_upto"] = data.get("summary_upto", 0)
             session["config"] = data.get("config", session["config"])
             
          
@@ -334,6 +364,8 @@ async def main_page():
         
         current_chat_id = str(uuid.uuid4())
         session["history"] = []
+        session["summary"] = ""
+        session["summary_upto"] = 0
         session["attachments"] = []
         messages_container.clear()
         update_attachments_ui() 
@@ -362,6 +394,28 @@ async def main_page():
         
         bridge_input.value = ""
 
+    async def refresh_summary():
+        from agents.summarizer import ConversationSummarizer
+        from core.llm import LLMEngine
+
+        chat_id = current_chat_id
+        summarizer = ConversationSummarizer(LLMEngine())
+        if chat_id in SUMMARIES_RUNNING or not summarizer.pending(session["history"], session["summary_upto"]):
+            # Uma atualização já em curso; o que ficar pendente entra na próxima, disparada no fim do próximo turno.
+            return
+        SUMMARIES_RUNNING.add(chat_id)
+        try:
+            summary, upto = await summarizer.update(session["summary"], session["summary_upto"], list(session["history"]))
+        except Exception as e:
+            print(f"[RESUMO] Falha ao atualizar resumo: {e}")
+            return
+        finally:
+            SUMMARIES_RUNNING.discard(chat_id)
+        if chat_id != current_chat_id:
+            return
+        session["summary"], session["summary_upto"] = summary, upto
+        save_current_chat()
+
     def remove_attachment(path):
         if path in session["attachments"]:
             session["attachments"].remove(path)
@@ -487,6 +541,8 @@ async def main_page():
                             
                         
                         with ui.row().classes('items-center gap-3'):
+                            ui.select({'auto': 'Auto', 'chat': 'Chat', 'task': 'Tarefa'}, value=session["config"].get("mode", "auto"),
+                                      on_change=lambda e: session["config"].update(mode=e.value)).props('dense borderless options-dense').classes('text-[10px] text-zinc-400 min-w-[70px]').tooltip('Modo: Auto classifica cada mensagem')
                             ui.label(f'{session["config"]["model"]}').classes('text-[10px] text-zinc-500 font-mono px-2 bg-zinc-900 rounded py-1')
                             btn_send = ui.button(icon='arrow_upward', on_click=lambda: run_chat()).props('unelevated round color=indigo-600 size=md shadow-lg shadow-indigo-500/20')
 
@@ -612,22 +668,28 @@ async def main_page():
         chat_scroll.scroll_to(percent=1.0)
         
         try:
-            from agents.workflow import TrebuchetOrchestrator
-            
-            orch = TrebuchetOrchestrator()
-            workflow = orch.build()
+            # A UI não passa pelo MissionScheduler da API (api/scheduler.py): é um processo local de um operador, com
+            # no máximo uma missão por página (session["running"]) e atualizações transmitidas nó a nó. A disputa
+            # pelo modelo com outros chamadores é resolvida na fila do InferenceScheduler.
+            workflow = get_workflow()
             agent_indicators = {}
             
+            from agents.summarizer import ConversationSummarizer
+
             history_for_graph = []
-            for m in session["history"]:
+            for m in ConversationSummarizer.recent(session["history"]):
                 history_for_graph.append({"role": m["role"], "content": m["content"]})
 
             initial_state = {
+                "thread_id": current_chat_id,
+                "trace_id": uuid.uuid4().hex,
                 "objective": agent_context,
                 "status": "architecting",
                 "chat_history": history_for_graph,
+                "conversation_summary": session["summary"],
                 "completed_log": [],
                 "current_mode": "task",
+                "pinned_mode": session["config"].get("mode") if session["config"].get("mode") in ("chat", "task") else None,
                 "agent_config": session["config"],
                 "micro_task_queue": [],
                 "current_micro_task": "",
@@ -639,80 +701,82 @@ async def main_page():
             
             final_answer = ""
             
-            async for event in workflow.astream(initial_state):
-                try:
-                    await asyncio.sleep(0.001)
+            with Tracer.get_instance().span("mission", kind="mission", trace_id=initial_state["trace_id"], thread_id=current_chat_id, objective=text[:200]):
+                async for event in workflow.astream(initial_state):
+                    try:
+                        await asyncio.sleep(0.001)
                     
-                    for node, updates in event.items():
+                        for node, updates in event.items():
                         
-                        system_log(f"Nó Ativo: {node.upper()}", "info")
+                            system_log(f"Nó Ativo: {node.upper()}", "info")
                         
-                        if "completed_log" in updates and updates["completed_log"]:
-                            log_msg = updates["completed_log"][-1]
-                            if "RESPOSTA:" in log_msg:
-                                response_text.content = log_msg.split("RESPOSTA:")[1].strip()
+                            if "completed_log" in updates and updates["completed_log"]:
+                                log_msg = updates["completed_log"][-1]
+                                if "RESPOSTA:" in log_msg:
+                                    response_text.content = log_msg.split("RESPOSTA:")[1].strip()
                         
-                        if "current_thought" in updates:
-                            system_log(f"Thought: {updates['current_thought'][:50]}...", "warning")
+                            if "current_thought" in updates:
+                                system_log(f"Thought: {updates['current_thought'][:50]}...", "warning")
 
-                        for key, els in agent_indicators.items():
-                            els['dot'].classes('bg-zinc-600 shadow-zinc-600', remove='bg-emerald-500 shadow-emerald-500 bg-amber-500 shadow-amber-500 animate-pulse')
-                            els['spinner'].set_visibility(False)
+                            for key, els in agent_indicators.items():
+                                els['dot'].classes('bg-zinc-600 shadow-zinc-600', remove='bg-emerald-500 shadow-emerald-500 bg-amber-500 shadow-amber-500 animate-pulse')
+                                els['spinner'].set_visibility(False)
 
-                        active_key = None
-                        if node in ['architect', 'planner']: active_key = 'thinking'
-                        elif node in ['tools', 'coder', 'action']: active_key = 'executing'
-                        elif node in ['reviewer', 'critic']: active_key = 'analyzing'
+                            active_key = None
+                            if node in ['architect', 'planner']: active_key = 'thinking'
+                            elif node in ['tools', 'coder', 'action']: active_key = 'executing'
+                            elif node in ['reviewer', 'critic']: active_key = 'analyzing'
                         
-                        if active_key and active_key in agent_indicators:
-                            els = agent_indicators[active_key]
-                            els['dot'].classes('bg-emerald-500 shadow-emerald-500 animate-pulse', remove='bg-zinc-600 shadow-zinc-600')
-                            els['spinner'].set_visibility(True)
-
-                        if "current_thought" in updates:
-                            thought = updates["current_thought"]
-                            if 'spinner' in locals(): 
-                                spinner.set_visibility(False)
-
-                            thought_display.content = f"**[{node.upper()}]**: {thought}"
-                            thought_expander.value = True
+                            if active_key and active_key in agent_indicators:
+                                els = agent_indicators[active_key]
+                                els['dot'].classes('bg-emerald-500 shadow-emerald-500 animate-pulse', remove='bg-zinc-600 shadow-zinc-600')
+                                els['spinner'].set_visibility(True)
+
+                            if "current_thought" in updates:
+                                thought = updates["current_thought"]
+                                if 'spinner' in locals(): 
+                                    spinner.set_visibility(False)
+
+                                thought_display.content = f"**[{node.upper()}]**: {thought}"
+                                thought_expander.value = True
                             
-                        if "final_response" in updates:
-                            if 'spinner' in locals(): 
-                                try: spinner.set_visibility(False)
-                                except: pass
+                            if "final_response" in updates:
+                                if 'spinner' in locals(): 
+                                    try: spinner.set_visibility(False)
+                                    except: pass
                                 
-                            final_answer = updates["final_response"]
-                            response_text.content = final_answer 
+                                final_answer = updates["final_response"]
+                                response_text.content = final_answer 
                             
-                            chat_scroll.scroll_to(percent=1.0)
+                                chat_scroll.scroll_to(percent=1.0)
 
-                except RuntimeError:
-                    return
+                    except RuntimeError:
+                        return
 
             if final_answer:
                 session["history"].append({"role": "user", "content": text})
                 session["history"].append({"role": "assistant", "content": final_answer})
                 
                 save_current_chat()
+                asyncio.create_task(refresh_summary())
                 
-                memory = MemoryManager.get_instance()
+                ingest_queue = IngestQueue.get_instance()
                 
-                memory.ingest_universal(
+                ingest_queue.submit(
                     content=text, 
                     source_type="chat_interaction", 
                     metadata={"role": "user", "chat_id": current_chat_id},
                     thread_id=current_chat_id
                 )
                 
-                memory.ingest_universal(
+                ingest_queue.submit(
                     content=final_answer, 
                     source_type="chat_interaction", 
                     metadata={"role": "assistant", "chat_id": current_chat_id},
                     thread_id=current_chat_id
                 )
 
-                system_log("Resposta gerada e indexada na memória.", "success")
+                system_log("Resposta gerada; indexação na memória enfileirada.", "success")
 
         except RuntimeError:
             pass
@@ -1,6 +1,6 @@
 import sys
 import os
-from interface.ui import run_ui
+import multiprocessing
 
 if os.name == "nt": 
     import ctypes
@@ -9,6 +9,9 @@ if os.name == "nt":
     except:
         pass
 
-if __name__ in {"__main__", "__mp_main__"}:
+# __mp_main__ é o processo do reloader do NiceGUI; os SplitWorker (memory.chunking) também reimportam este arquivo
+# com esse nome, mas só dividem documentos.
+if __name__ in {"__main__", "__mp_main__"} and not multiprocessing.current_process().name.startswith("SplitWorker"):
+    from interface.ui import run_ui
     print("TREBUCHET FRAMEWORK v4.0")
     run_ui()
\ No newline at end of file
@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import Dict, Optional
+from core.config import Config
+
+class BlobStore:
+    """Armazena saídas completas de ferramentas fora do estado do grafo, endereçadas pelo hash do conteúdo."""
+    _instance = None
+
+    def __init__(self, base_path: Optional[str] = None):
+        self.base_path = base_path or os.path.join(Config.DIRS["cache"], "blobs")
+        os.makedirs(self.base_path, exist_ok=True)
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _path(self, blob_id: str) -> str:
+        return os.path.join(self.base_path, blob_id[:2], f"{blob_id}.txt")
+
+    def put(self, content: str, meta: Dict = None) -> str:
+        blob_id = hashlib.sha256(content.encode("utf-8", errors="ignore")).hexdigest()
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            return blob_id
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write_atomic(path, content)
+        if meta:
+            self._write_atomic(f"{path[:-4]}.meta.json", json.dumps(meta, ensure_ascii=False))
+        return blob_id
+
+    @staticmethod
+    def _write_atomic(path: str, content: str):
+        """
+        Grava num temporário único e renomeia. Sub-agentes podem gravar o mesmo blob ao mesmo tempo: o conteúdo é
+        o mesmo, então se o destino já existe quando a troca falha, a gravação do outro vale.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            if not os.path.exists(path):
+                raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def resolve(self, blob_ref: str) -> Optional[str]:
+        blob_ref = blob_ref.strip().replace("blob:", "")
+        if len(blob_ref) < 8:
+            return None
+        shard = os.path.join(self.base_path, blob_ref[:2])
+        if not os.path.isdir(shard):
+            return None
+        matches = [f[:-4] for f in os.listdir(shard) if f.startswith(blob_ref) and f.endswith(".txt")]
+        return matches[0] if len(matches) == 1 else None
+
+    def exists(self, blob_id: str) -> bool:
+        return self.resolve(blob_id) is not None
+
+    def get(self, blob_id: str) -> Optional[str]:
+        blob_id = self.resolve(blob_id)
+        if blob_id is None:
+            return None
+        path = self._path(blob_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def read_page(self, blob_id: str, page: int = 0, page_size: int = None) -> Dict:
+        page_size = page_size or Config.BLOB_PAGE_SIZE
+        content = self.get(blob_id)
+        if content is None:
+            return {"found": False, "content": "", "page": page, "total_pages": 0, "total_chars": 0}
+
+        total_pages = max(1, -(-len(content) // page_size))
+        page = max(0, min(page, total_pages - 1))
+        start = page * page_size
+        return {
+            "found": True,
+            "content": content[start:start + page_size],
+            "page": page,
+            "total_pages": total_pages,
+            "total_chars": len(content)
+        }
+
+    @staticmethod
+    def make_ref(blob_id: str, content: str, preview_chars: int = None) -> str:
+        preview_chars = preview_chars or Config.TOOL_OUTPUT_PREVIEW
+        if len(content) <= preview_chars:
+            return content
+        return f"{content[:preview_chars]}\n... [saída completa: {len(content)} chars em blob:{blob_id[:16]} | use read_blob para paginar]"
@@ -0,0 +1,87 @@
+import os
+import multiprocessing.context
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter, Language
+from core.config import Config
+from memory.embedders import load_tokenizer
+
+LANGUAGES = {
+    ".py": Language.PYTHON, ".js": Language.JS, ".ts": Language.TS,
+    ".tsx": Language.TS, ".java": Language.JAVA, ".cpp": Language.CPP,
+    ".go": Language.GO, ".rs": Language.RUST, ".php": Language.PHP,
+    ".rb": Language.RUBY, ".html": Language.HTML,
+    ".md": Language.MARKDOWN, ".sol": Language.SOL
+}
+
+def _length_function(mode: str):
+    if mode == "tokens":
+        tokenizer = load_tokenizer()
+        if tokenizer is not None:
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        print("[MEMORY] Tokenizador indisponível; chunking por caracteres.")
+    return len
+
+class ChunkingEngine:
+    """
+    Divide documentos em chunks. Em CHUNK_LENGTH_MODE = "tokens" os tamanhos são medidos com o tokenizador do
+    embedder (chunks cabem inteiros na janela dele); em "chars", por caracteres. Os splitters são reaproveitados
+    entre chamadas, um por (linguagem, tamanho, sobreposição, modo).
+    """
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def length_mode() -> tuple:
+        """(modo efetivo, função de comprimento); cai para caracteres se não houver tokenizador."""
+        length = _length_function(Config.CHUNK_LENGTH_MODE)
+        return ("chars" if length is len else "tokens"), length
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def splitter(language: Optional[Language], chunk_size: int, chunk_overlap: int, mode: str) -> RecursiveCharacterTextSplitter:
+        length = ChunkingEngine.length_mode()[1] if mode == "tokens" else len
+        if language:
+            return RecursiveCharacterTextSplitter.from_language(
+                language=language, chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=length
+            )
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", ". ", " ", ""],
+            length_function=length
+        )
+
+    @staticmethod
+    def split(text: str, domain: str, metadata: Dict) -> List[str]:
+        # chunk_size/chunk_overlap nos metadados estão na unidade do modo ativo.
+        mode = ChunkingEngine.length_mode()[0]
+        default_size, default_overlap = (Config.CHUNK_TOKENS, Config.CHUNK_TOKEN_OVERLAP) if mode == "tokens" else (1000, 200)
+        chunk_size = metadata.get("chunk_size", default_size)
+        chunk_overlap = metadata.get("chunk_overlap", default_overlap)
+
+        language = None
+        if domain == "code":
+            filename = metadata.get("filename", "")
+            language = LANGUAGES.get(os.path.splitext(filename)[1].lower() if filename else "")
+
+        return ChunkingEngine.splitter(language, chunk_size, chunk_overlap, mode).split_text(text)
+
+def split_document(job: tuple) -> List[str]:
+    """Divide um (texto, domínio, metadados); ponto de entrada do pool de divisão da sincronização."""
+    text, domain, metadata = job
+    return ChunkingEngine.split(text, domain, metadata)
+
+class SplitWorker(multiprocessing.context.SpawnProcess):
+    """Processo do pool de divisão. O main.py reconhece o nome (SplitWorker-N) e não sobe a interface nele."""
+
+class _SplitContext(multiprocessing.context.SpawnContext):
+    Process = SplitWorker
+
+def split_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de processos para split_document. Spawn, não fork: fork a partir da sincronização (UI, Chroma e tokenizador
+    com threads próprias) pode herdar locks presos. Os filhos reimportam o main.py como __mp_main__.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=_SplitContext())
@@ -0,0 +1,167 @@
+import re
+import sqlite3
+import hashlib
+import threading
+from typing import Collection, Dict, List, Optional
+
+from core.config import Config
+
+BITS = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS simhashes (
+    chunk_id TEXT PRIMARY KEY,
+    source TEXT,
+    hash INTEGER NOT NULL,
+    duplicates INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS simhash_bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    chunk_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bands_value ON simhash_bands(band, value);
+CREATE INDEX IF NOT EXISTS idx_bands_chunk ON simhash_bands(chunk_id);
+"""
+
+SETTINGS = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Versão do esquema das tabelas de hashes; outra versão descarta o índice e o backfill o repopula.
+LAYOUT = "2"
+
+def source_of(metadata: Dict) -> Optional[str]:
+    """
+    Origem de um chunk para fins de deduplicação: o arquivo (path/filename) ou, sem arquivo, a thread.
+    Só se suprime duplicata da mesma origem; entre arquivos diferentes, editar ou apagar um deles sumiria com o texto do outro.
+    """
+    metadata = metadata or {}
+    return metadata.get("path") or metadata.get("filename") or metadata.get("thread_id")
+
+def simhash(text: str) -> int:
+    """SimHash de 64 bits sobre palavras e bigramas (os bigramas mantêm a ordem relevante)."""
+    import numpy as np
+
+    words = re.findall(r"\w+", text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    digests = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big") for f in features],
+        dtype=np.uint64
+    )
+    bits = np.unpackbits(digests.astype(">u8").view(np.uint8).reshape(-1, 8), axis=1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(features)
+    return int("".join("1" if v > 0 else "0" for v in votes), 2)
+
+def bands(value: int, count: int) -> List[int]:
+    """
+    Divide o hash em `count` faixas contíguas. Com count = distância máxima + 1, dois hashes dentro da
+    distância coincidem em pelo menos uma faixa (casa dos pombos), então basta buscar candidatos por faixa.
+    """
+    widths = [BITS // count + (1 if i < BITS % count else 0) for i in range(count)]
+    result, shift = [], 0
+    for width in widths:
+        result.append((value >> shift) & ((1 << width) - 1))
+        shift += width
+    return result
+
+def _signed(value: int) -> int:
+    # SQLite guarda INTEGER com sinal.
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+class NearDuplicateIndex:
+    """
+    Índice LSH de SimHashes dos chunks gravados, persistido ao lado do vector store.
+    Um chunk novo a até DEDUP_MAX_HAMMING bits de um existente da mesma origem (source_of) é considerado duplicata.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.band_count = Config.DEDUP_MAX_HAMMING + 1
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SETTINGS)
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'layout'").fetchone()
+        if row is None or row["value"] != LAYOUT:
+            # Esquema antigo (escopo por thread): recria as tabelas vazias.
+            with self.conn:
+                self.conn.execute("DROP TABLE IF EXISTS simhashes")
+                self.conn.execute("DROP TABLE IF EXISTS simhash_bands")
+                self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('layout', ?)", (LAYOUT,))
+        self.conn.executescript(SCHEMA)
+
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'bands'").fetchone()
+        if row is None or int(row["value"]) != self.band_count:
+            # Outra distância máxima muda as faixas: esvazia e deixa o backfill do vector store repopular.
+            with self.conn:
+                self.conn.execute("DELETE FROM simhashes")
+                self.conn.execute("DELETE FROM simhash_bands")
+                self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('bands', ?)", (str(self.band_count),))
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM simhashes").fetchone()[0]
+
+    def suppressed(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(duplicates), 0) FROM simhashes").fetchone()[0]
+
+    def _find(self, value: int, source: Optional[str], exclude_prefix: Optional[str], exclude_ids: Collection[str],
+              keep_ids: Collection[str]) -> Optional[str]:
+        probes = list(enumerate(bands(value, self.band_count)))
+        rows = self.conn.execute(
+            f"""SELECT DISTINCT s.chunk_id, s.hash FROM simhash_bands b JOIN simhashes s ON s.chunk_id = b.chunk_id
+                WHERE s.source IS ? AND ({' OR '.join('(b.band = ? AND b.value = ?)' for _ in probes)})""",
+            [source] + [x for probe in probes for x in probe]
+        ).fetchall()
+        for row in rows:
+            chunk_id = row["chunk_id"]
+            if ((exclude_prefix and chunk_id.startswith(exclude_prefix)) or chunk_id in exclude_ids) and chunk_id not in keep_ids:
+                continue
+            if bin((row["hash"] & ((1 << BITS) - 1)) ^ value).count("1") <= Config.DEDUP_MAX_HAMMING:
+                return row["chunk_id"]
+        return None
+
+    def check_and_add(self, chunk_id: str, text: str, source: Optional[str] = None, exclude_prefix: Optional[str] = None,
+                      exclude_ids: Collection[str] = (), keep_ids: Collection[str] = ()) -> Optional[str]:
+        """
+        Devolve o id do chunk de que este é quase-duplicata (e conta a ocorrência nele) ou registra o chunk e devolve None.
+        exclude_prefix/exclude_ids ignoram a versão anterior do documento, que está sendo substituída (e será apagada);
+        keep_ids são os chunks da versão nova já registrados, que valem mesmo com id igual ao de um antigo.
+        """
+        value = simhash(text)
+        with self._lock, self.conn:
+            original = self._find(value, source, exclude_prefix, exclude_ids, keep_ids)
+            if original is not None:
+                self.conn.execute("UPDATE simhashes SET duplicates = duplicates + 1 WHERE chunk_id = ?", (original,))
+                return original
+            self._insert([(chunk_id, source, value)])
+            return None
+
+    def _insert(self, rows: List[tuple]):
+        ids = [(chunk_id,) for chunk_id, _, _ in rows]
+        self.conn.executemany("DELETE FROM simhash_bands WHERE chunk_id = ?", ids)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO simhashes (chunk_id, source, hash) VALUES (?, ?, ?)",
+            [(chunk_id, source, _signed(value)) for chunk_id, source, value in rows]
+        )
+        self.conn.executemany(
+            "INSERT INTO simhash_bands (band, value, chunk_id) VALUES (?, ?, ?)",
+            [(band, part, chunk_id) for chunk_id, _, value in rows for band, part in enumerate(bands(value, self.band_count))]
+        )
+
+    def upsert(self, texts: List[str], metadatas: List[Dict], ids: List[str]):
+        rows = [(chunk_id, source_of(meta), simhash(text)) for text, meta, chunk_id in zip(texts, metadatas, ids)]
+        with self._lock, self.conn:
+            self._insert(rows)
+
+    def delete(self, ids: List[str]):
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM simhashes WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            self.conn.executemany("DELETE FROM simhash_bands WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
@@ -0,0 +1,185 @@
+import os
+import time
+import threading
+import importlib.util
+from functools import lru_cache
+from typing import List
+from core.config import Config
+
+class BaseEmbedder:
+    """Interface dos backends de embedding (compatível com o que o Chroma/LangChain espera)."""
+    name: str = "base"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+class HuggingFaceEmbedder(BaseEmbedder):
+    """sentence-transformers em PyTorch (fp32). Puxa torch; fica como fallback e referência de paridade."""
+
+    def __init__(self, model_name: str = None):
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        self.name = f"{self.model_name}@huggingface"
+        self.model = HuggingFaceEmbeddings(model_name=self.model_name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+def _local_dir(model_name: str) -> str:
+    return os.path.join(Config.DIRS["models"], "embeddings", model_name.split("/")[-1])
+
+def tokenizer_file(model_name: str = None, local_only: bool = False) -> str:
+    """Caminho do tokenizer.json; com local_only, só procura no disco (cache do hub incluso) e nunca baixa."""
+    model_name = model_name or Config.EMBEDDING_MODEL
+    path = os.path.join(_local_dir(model_name), "tokenizer.json")
+    if os.path.exists(path):
+        return path
+    from huggingface_hub import hf_hub_download
+    return hf_hub_download(model_name, "tokenizer.json", cache_dir=os.path.join(Config.DIRS["models"], "hf"), local_files_only=local_only)
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str = None):
+    """
+    Tokenizador do modelo de embedding (sem truncamento), ou None se tokenizers/arquivo não estiverem no disco.
+    Roda no caminho da sincronização, então não baixa nada: sem o arquivo local, o chunking cai para caracteres.
+    """
+    if importlib.util.find_spec("tokenizers") is None:
+        return None
+    from tokenizers import Tokenizer
+    try:
+        return Tokenizer.from_file(tokenizer_file(model_name, local_only=True))
+    except Exception as e:
+        print(f"[MEMORY] Tokenizador de {model_name or Config.EMBEDDING_MODEL} indisponível: {e}")
+        return None
+
+class OnnxEmbedder(BaseEmbedder):
+    """
+    Mesmo modelo exportado para ONNX e quantizado em int8, rodando no ONNX Runtime com threads limitadas
+    (para não disputar núcleos com o llama.cpp). Mean pooling + normalização L2, como o sentence-transformers.
+    """
+
+    def __init__(self, model_name: str = None):
+        import numpy as np
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.np = np
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        self.name = f"{self.model_name}@onnx-int8"
+        model_path, tokenizer_path = self._resolve_files()
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=Config.EMBED_MAX_TOKENS)
+        self.tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = Config.EMBED_THREADS
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _resolve_files(self):
+        model_path = os.path.join(_local_dir(self.model_name), os.path.basename(Config.ONNX_EMBEDDING_FILE))
+        if not os.path.exists(model_path):
+            from huggingface_hub import hf_hub_download
+            print(f"[MEMORY] Baixando {Config.ONNX_EMBEDDING_FILE} de {self.model_name}...")
+            model_path = hf_hub_download(self.model_name, Config.ONNX_EMBEDDING_FILE, cache_dir=os.path.join(Config.DIRS["models"], "hf"))
+        return model_path, tokenizer_file(self.model_name)
+
+    def _batches(self, encodings):
+        """Agrupa por comprimento para minimizar padding, limitando tokens por lote (lotes dinâmicos)."""
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i].ids))
+        batch: List[int] = []
+        for i in order:
+            longest = len(encodings[i].ids)
+            if batch and (len(batch) + 1) * longest > Config.EMBED_BATCH_TOKENS:
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        np = self.np
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch(list(texts))
+        results: List[List[float]] = [[] for _ in texts]
+
+        for batch in self._batches(encodings):
+            width = max(len(encodings[i].ids) for i in batch)
+            ids = np.zeros((len(batch), width), dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                n = len(encodings[i].ids)
+                ids[row, :n] = encodings[i].ids
+                mask[row, :n] = 1
+
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feeds)[0]
+
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for row, i in enumerate(batch):
+                results[i] = pooled[row].tolist()
+        return results
+
+BACKENDS = {"huggingface": HuggingFaceEmbedder, "onnx": OnnxEmbedder}
+
+def resolve_backend(backend: str = None) -> str:
+    backend = backend or Config.EMBEDDING_BACKEND
+    if backend == "onnx" and not all(importlib.util.find_spec(m) for m in ("onnxruntime", "tokenizers")):
+        return "huggingface"
+    return backend
+
+def embedder_name(backend: str = None) -> str:
+    """Identificador do embedder que seria carregado, sem carregá-lo (usado como chave de cache)."""
+    suffix = {"onnx": "onnx-int8"}.get(resolve_backend(backend), "huggingface")
+    return f"{Config.EMBEDDING_MODEL}@{suffix}"
+
+def build_embedder(backend: str = None) -> BaseEmbedder:
+    requested = backend or Config.EMBEDDING_BACKEND
+    backend = resolve_backend(requested)
+    if backend != requested:
+        print(f"[MEMORY] Backend '{requested}' indisponível (onnxruntime/tokenizers não instalados); usando '{backend}'.")
+    start = time.perf_counter()
+    embedder = BACKENDS[backend]()
+    print(f"[MEMORY] Embedder {embedder.name} carregado em {time.perf_counter() - start:.2f}s")
+    return embedder
+
+class LazyEmbedder(BaseEmbedder):
+    """Adia o carregamento do modelo até o primeiro embed (ou até load() ser chamado explicitamente)."""
+
+    def __init__(self, backend: str = None):
+        self.backend = backend
+        self.name = embedder_name(backend)
+        self._embedder = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._embedder is not None
+
+    def load(self) -> BaseEmbedder:
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    self._embedder = build_embedder(self.backend)
+        return self._embedder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.load().embed_query(text)
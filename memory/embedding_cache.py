@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from core.config import Config
+
+# v2: keys.bin guarda, por slot, a impressão da chave gravada ali.
+CACHE_FORMAT = 2
+
+class CachedEmbeddings:
+    """
+    Cache de embeddings na frente do modelo, chaveado por (modelo, hash do texto normalizado).
+    Dois níveis: LRU em memória e um array memmap em disco (float16 por padrão) com arquivo de índice.
+    O disco respeita um orçamento de tamanho; quando cheio, os slots menos usados são reaproveitados.
+    O índice é gravado de tempos em tempos, os vetores na hora; por isso cada slot guarda também a impressão
+    da chave (keys.bin) e a leitura confere: depois de uma queda, um slot reaproveitado não serve o vetor errado.
+    """
+
+    def __init__(self, inner, model_name: str, cache_dir: Optional[str] = None):
+        self.inner = inner
+        self.model_name = model_name
+        slug = re.sub(r"[^\w.-]", "_", model_name)
+        self.cache_dir = cache_dir or os.path.join(Config.DIRS["cache"], "embeddings", slug)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.data_path = os.path.join(self.cache_dir, "vectors.bin")
+        self.keys_path = os.path.join(self.cache_dir, "keys.bin")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+
+        import numpy as np
+        self.np = np
+        self.dtype = np.dtype(Config.EMBED_CACHE_DTYPE)
+        self.memory: OrderedDict = OrderedDict()
+        self.memory_items = Config.EMBED_CACHE_MEMORY_ITEMS
+
+        self.dim = 0
+        self.slots: Dict[str, List[int]] = {}  # key -> [slot, último acesso]
+        self.free: List[int] = []
+        self.next_slot = 0
+        self.tick = 0
+        self._mm = None
+        self._keys_mm = None
+        self._capacity = 0
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.RLock()
+
+        self.hits = {"memory": 0, "disk": 0, "miss": 0}
+        self._load_index()
+        atexit.register(self.save)
+
+    # --- Persistência ---
+
+    def _load_index(self):
+        if not all(os.path.exists(p) for p in (self.index_path, self.data_path, self.keys_path)):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("format") != CACHE_FORMAT or index.get("dtype") != self.dtype.name or not index.get("dim"):
+                return
+            self.dim = index["dim"]
+            self.slots = index["slots"]
+            self.free = index.get("free", [])
+            self.next_slot = index.get("next_slot", 0)
+            self.tick = index.get("tick", 0)
+            self._open(max(self.next_slot, 1))
+        except Exception as e:
+            print(f"[MEMORY] Índice do cache de embeddings inválido, recomeçando: {e}")
+            self.slots, self.free, self.next_slot, self.dim = {}, [], 0, 0
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or self._mm is None:
+                return
+            self._mm.flush()
+            self._keys_mm.flush()
+            index = {"format": CACHE_FORMAT, "model": self.model_name, "dim": self.dim, "dtype": self.dtype.name, "slots": self.slots,
+                     "free": self.free, "next_slot": self.next_slot, "tick": self.tick}
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    @property
+    def max_slots(self) -> int:
+        return max(1, int(Config.EMBED_CACHE_DISK_MB * 1024 * 1024 // (self.dim * self.dtype.itemsize)))
+
+    def _open(self, needed: int):
+        if needed <= self._capacity:
+            return
+        capacity = min(max(needed, 2 * self._capacity, 1024), self.max_slots)
+        if self._mm is not None:
+            self._mm.flush()
+            self._keys_mm.flush()
+            self._mm = self._keys_mm = None
+        for path, size in ((self.data_path, capacity * self.dim * self.dtype.itemsize), (self.keys_path, capacity * 8)):
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+        self._mm = self.np.memmap(self.data_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+        self._keys_mm = self.np.memmap(self.keys_path, dtype=self.np.uint64, mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    def _alloc_slot(self) -> int:
+        if self.free:
+            return self.free.pop()
+        if self.next_slot < self.max_slots:
+            self._open(self.next_slot + 1)
+            self.next_slot += 1
+            return self.next_slot - 1
+        # Orçamento de disco esgotado: libera os 10% menos recentemente usados.
+        victims = sorted(self.slots.items(), key=lambda item: item[1][1])[:max(1, len(self.slots) // 10)]
+        for key, (slot, _) in victims:
+            del self.slots[key]
+            self.free.append(slot)
+        return self.free.pop()
+
+    # --- Cache ---
+
+    def key(self, text: str, kind: str = "doc") -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha1(f"{self.model_name}\0{kind}\0{normalized}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _fingerprint(key: str) -> int:
+        # 0 marca slot nunca escrito.
+        return int(key[:16], 16) or 1
+
+    def _remember(self, key: str, vector: List[float]):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        self.tick += 1
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory.move_to_end(key)
+            self.hits["memory"] += 1
+            return vector
+        entry = self.slots.get(key)
+        if entry is not None and self._mm is not None and int(self._keys_mm[entry[0]]) != self._fingerprint(key):
+            # Índice desatualizado (queda depois de reaproveitar o slot): o vetor ali é de outra chave.
+            del self.slots[key]
+            self.free.append(entry[0])
+            self._dirty = True
+            entry = None
+        if entry is not None and self._mm is not None:
+            entry[1] = self.tick
+            self._dirty = True
+            vector = self.np.asarray(self._mm[entry[0]], dtype=self.np.float32).tolist()
+            self._remember(key, vector)
+            self.hits["disk"] += 1
+            return vector
+        self.hits["miss"] += 1
+        return None
+
+    def _put(self, key: str, vector: List[float]):
+        if not self.dim:
+            self.dim = len(vector)
+        if len(vector) != self.dim:
+            return
+        slot = self._alloc_slot()
+        self._mm[slot] = self.np.asarray(vector, dtype=self.dtype)
+        self._keys_mm[slot] = self._fingerprint(key)
+        self.slots[key] = [slot, self.tick]
+        self._dirty = True
+        self._remember(key, vector)
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [self.key(text, kind) for text in texts]
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            results = [self._get(key) for key in keys]
+
+        missing = {}
+        for i, vector in enumerate(results):
+            if vector is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            # Textos repetidos no mesmo lote são embedados uma única vez.
+            unique = [texts[positions[0]] for positions in missing.values()]
+            if kind == "query":
+                computed = [self.inner.embed_query(text) for text in unique]
+            else:
+                computed = self.inner.embed_documents(unique)
+            with self._lock:
+                for (key, positions), vector in zip(missing.items(), computed):
+                    vector = list(vector)
+                    self._put(key, vector)
+                    for i in positions:
+                        results[i] = vector
+                if time.monotonic() - self._last_save > Config.EMBED_CACHE_SAVE_INTERVAL:
+                    self.save()
+        return results  # type: ignore[return-value]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), "doc")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def stats(self) -> Dict:
+        total = sum(self.hits.values())
+        return {
+            "model": self.model_name,
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.hits["miss"],
+            "hit_rate": round((self.hits["memory"] + self.hits["disk"]) / total, 3) if total else 0.0,
+            "memory_items": len(self.memory),
+            "disk_items": len(self.slots),
+            "disk_capacity": self.max_slots if self.dim else 0,
+            "disk_mb": round(os.path.getsize(self.data_path) / (1024 * 1024), 2) if os.path.exists(self.data_path) else 0.0
+        }
@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import datetime
+import threading
+from typing import Dict, List, Optional
+from core.config import Config
+from memory.text_index import TextIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    timestamp REAL NOT NULL,
+    iso_time TEXT,
+    type TEXT,
+    thread_id TEXT,
+    domain TEXT,
+    content TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_thread ON events(thread_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events(type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_domain ON events(domain, timestamp);
+"""
+
+COLUMNS = ("id", "timestamp", "iso_time", "type", "thread_id", "domain", "content", "metadata")
+
+class EpisodicStore:
+    """
+    Log episódico append-only em segmentos SQLite (WAL), indexados por timestamp, thread, tipo e domínio.
+    Um segmento novo é aberto quando o atual passa de EPISODIC_SEGMENT_ROWS eventos.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, base_path: str, index=None):
+        self.base_path = base_path
+        self.index = index
+        self.segments_dir = os.path.join(base_path, "segments")
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conns: Dict[str, sqlite3.Connection] = {}
+        self._current: Optional[str] = None
+        self._current_rows = 0
+
+        segments = self.segments()
+        if segments:
+            self._current = segments[-1]
+            self._current_rows = self._conn(self._current).execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        else:
+            self._rotate()
+
+        if self.legacy_files(limit=1):
+            print("[MEMORY] Há episódios no formato antigo (um JSON por evento). Migre com: python -m memory.episodic migrate")
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(Config.DIRS["episodic"], index=TextIndex.get_instance())
+            return cls._instance
+
+    # --- Segmentos ---
+
+    def segments(self) -> List[str]:
+        return sorted(os.path.join(self.segments_dir, f) for f in os.listdir(self.segments_dir) if f.endswith(".sqlite"))
+
+    def _conn(self, path: str) -> sqlite3.Connection:
+        conn = self._conns.get(path)
+        if conn is None:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conns[path] = conn
+        return conn
+
+    def _rotate(self):
+        index = len(self.segments())
+        self._current = os.path.join(self.segments_dir, f"episodes-{index:06d}.sqlite")
+        self._conn(self._current)
+        self._current_rows = 0
+
+    # --- Escrita ---
+
+    @staticmethod
+    def _row(event_id: str, content: str, type: str, meta: Dict) -> tuple:
+        timestamp = meta.get("timestamp", time.time())
+        return (
+            event_id,
+            timestamp,
+            meta.get("iso_time", datetime.datetime.fromtimestamp(timestamp).isoformat()),
+            type,
+            meta.get("thread_id", "unknown"),
+            meta.get("domain", "general"),
+            content,
+            json.dumps(meta, ensure_ascii=False, default=str)
+        )
+
+    def log(self, event_id: str, content: str, type: str, meta: Dict):
+        self.log_many([self._row(event_id, content, type, meta)])
+
+    def log_many(self, rows: List[tuple]) -> bool:
+        """Grava as linhas numa única transação. Retorna False (sem gravar nada) se a escrita falhar."""
+        try:
+            with self._lock:
+                if self._current_rows >= Config.EPISODIC_SEGMENT_ROWS:
+                    self._rotate()
+                conn = self._conn(self._current)
+                with conn:
+                    conn.executemany(f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+                self._current_rows += len(rows)
+        except Exception as e:
+            print(f"[MEMORY] Failed to write episodic log: {e}")
+            return False
+        if self.index is not None:
+            try:
+                self.index.add_episodes(rows)
+            except Exception as e:
+                print(f"[MEMORY] Falha ao indexar episódios para busca: {e}")
+        return True
+
+    # --- Leitura ---
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        entry = {key: row[key] for key in COLUMNS}
+        try:
+            entry["metadata"] = json.loads(entry["metadata"] or "{}")
+        except json.JSONDecodeError:
+            entry["metadata"] = {}
+        return entry
+
+    def query(self, limit: int = 10, thread_id: Optional[str] = None, type: Optional[str] = None,
+              domain: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """Os `limit` eventos mais recentes que casam com os filtros, em ordem cronológica."""
+        clauses, params = [], []
+        for column, value in (("thread_id", thread_id), ("type", type), ("domain", domain)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            # Segmentos do mais novo para o mais antigo; para quando nenhum segmento restante pode ter eventos mais recentes.
+            bounds = []
+            for path in self.segments():
+                newest = self._conn(path).execute("SELECT MAX(timestamp) FROM events").fetchone()[0]
+                if newest is not None:
+                    bounds.append((newest, path))
+            bounds.sort(reverse=True)
+
+            results: List[Dict] = []
+            for newest, path in bounds:
+                if len(results) >= limit and newest < results[limit - 1]["timestamp"]:
+                    break
+                rows = self._conn(path).execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM events {where} ORDER BY timestamp DESC LIMIT ?", params + [limit]
+                ).fetchall()
+                results.extend(self._to_dict(row) for row in rows)
+                results.sort(key=lambda e: e["timestamp"], reverse=True)
+                del results[limit:]
+        return results[::-1]
+
+    def get_recent(self, limit: int = 10) -> List[Dict]:
+        return self.query(limit=limit)
+
+    def search_text(self, query: str, limit: int = 10) -> List[Dict]:
+        if self.index is not None:
+            return self.index.search(query, limit=limit, source="episode")
+        pattern = f"%{query}%"
+        results: List[Dict] = []
+        with self._lock:
+            for path in reversed(self.segments()):
+                rows = self._conn(path).execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM events WHERE content LIKE ? ORDER BY timestamp DESC LIMIT ?",
+                    (pattern, limit - len(results))
+                ).fetchall()
+                results.extend(self._to_dict(row) for row in rows)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def reindex(self, batch_size: int = 1000) -> int:
+        """Reconstrói do zero a parte de episódios do índice full-text a partir dos segmentos."""
+        if self.index is None:
+            return 0
+        with self.index._db_lock, self.index.conn:
+            self.index.conn.execute("DELETE FROM documents WHERE source = 'episode'")
+        count = 0
+        for path in self.segments():
+            cursor = self._conn(path).execute(f"SELECT {', '.join(COLUMNS)} FROM events ORDER BY seq")
+            while True:
+                rows = [tuple(r) for r in cursor.fetchmany(batch_size)]
+                if not rows:
+                    break
+                self.index.add_episodes(rows)
+                count += len(rows)
+        return count
+
+    # --- Migração ---
+
+    def legacy_files(self, limit: Optional[int] = None) -> List[str]:
+        found = []
+        with os.scandir(self.base_path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    found.append(entry.path)
+                    if limit and len(found) >= limit:
+                        break
+        return found
+
+    def migrate_legacy(self, delete: bool = False, batch_size: int = 1000) -> int:
+        """
+        Importa os episódios antigos (um JSON por evento) em ordem cronológica. Só arquivos cujas linhas foram
+        gravadas são apagados/movidos; ilegíveis ficam onde estão, e uma falha de escrita interrompe a migração.
+        """
+        files = sorted(self.legacy_files())
+        migrated_dir = os.path.join(self.base_path, "migrated")
+        if not delete:
+            os.makedirs(migrated_dir, exist_ok=True)
+
+        count, skipped = 0, 0
+        for i in range(0, len(files), batch_size):
+            group = files[i:i + batch_size]
+            rows, parsed = [], []
+            for path in group:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    meta = dict(data.get("metadata") or {})
+                    meta.setdefault("timestamp", data.get("timestamp"))
+                    meta.setdefault("thread_id", data.get("thread_id", "unknown"))
+                    meta.setdefault("domain", data.get("domain", "general"))
+                    if data.get("iso_time"):
+                        meta.setdefault("iso_time", data["iso_time"])
+                    if meta["timestamp"] is None:
+                        meta["timestamp"] = os.path.getmtime(path)
+                    rows.append(self._row(data.get("id", os.path.basename(path)), data.get("content", ""), data.get("type", "unknown"), meta))
+                    parsed.append(path)
+                except Exception as e:
+                    skipped += 1
+                    print(f"[MEMORY] Mantendo {os.path.basename(path)} (não migrado): {e}")
+            if rows and not self.log_many(rows):
+                print(f"[MEMORY] Migração interrompida: falha ao gravar o lote; {len(files) - count - skipped} arquivos mantidos.")
+                break
+            count += len(rows)
+            for path in parsed:
+                if delete:
+                    os.remove(path)
+                else:
+                    os.replace(path, os.path.join(migrated_dir, os.path.basename(path)))
+            print(f"[MEMORY] {count}/{len(files)} episódios migrados")
+        return count
+
+if __name__ == "__main__":
+    # Uso: python -m memory.episodic migrate [--delete] | reindex
+    parser = argparse.ArgumentParser(description="Ferramentas do log episódico.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Importa episódios do formato antigo (um JSON por evento).")
+    migrate.add_argument("--delete", action="store_true", help="Apaga os JSON migrados em vez de movê-los para episodes/migrated.")
+    sub.add_parser("reindex", help="Reconstrói o índice full-text dos episódios.")
+    args = parser.parse_args()
+
+    store = EpisodicStore.get_instance()
+    if args.command == "migrate":
+        total = store.migrate_legacy(delete=args.delete)
+        print(f"[MEMORY] Migração concluída: {total} episódios.")
+    else:
+        total = store.reindex()
+        print(f"[MEMORY] Índice full-text reconstruído: {total} episódios.")
+    sys.exit(0)
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import uuid
+import queue
+import asyncio
+import threading
+from typing import Dict, List, Optional
+from core.config import Config
+
+class IngestQueue:
+    """
+    Worker de ingestão em segundo plano: os documentos entram numa fila limitada e são gravados
+    em lotes (por tamanho ou tempo) via MemoryManager.ingest_many. Um spool JSONL em disco garante
+    que nada enfileirado se perca se o processo cair antes do flush.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, memory=None, spool_path: Optional[str] = None):
+        self._memory = memory
+        self.spool_path = spool_path or os.path.join(Config.DIRS["cache"], "ingest_spool.jsonl")
+        self.queue: queue.Queue = queue.Queue(maxsize=Config.INGEST_QUEUE_SIZE)
+        self._spool_lock = threading.RLock()
+        self._worker: Optional[threading.Thread] = None
+        self._spilled = False
+        self._queued_ids = set()
+        self.stats = {"submitted": 0, "ingested": 0, "failed": 0, "batches": 0, "spilled": 0}
+        self._recover()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @property
+    def memory(self):
+        if self._memory is None:
+            from memory.manager import MemoryManager
+            self._memory = MemoryManager.get_instance()
+        return self._memory
+
+    # --- Spool ---
+
+    def _append_spool(self, record: Dict):
+        with self._spool_lock:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _pending_spool(self) -> List[Dict]:
+        if not os.path.exists(self.spool_path):
+            return []
+        entries, done = {}, set()
+        with self._spool_lock:
+            with open(self.spool_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if "done" in record:
+                        done.update(record["done"])
+                    else:
+                        entries[record["id"]] = record
+        return [entry for key, entry in entries.items() if key not in done]
+
+    def _compact_spool(self):
+        # Reescreve o spool só com o que ainda não foi gravado (em voo ou que falhou), descartando as marcas "done".
+        with self._spool_lock:
+            pending = self._pending_spool()
+            tmp = self.spool_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in pending:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.spool_path)
+
+    def _recover(self):
+        pending = self._pending_spool()
+        self._compact_spool()
+        if not pending:
+            return
+        print(f"[MEMORY] Recuperando {len(pending)} documentos pendentes do spool de ingestão.")
+        for entry in pending:
+            if not self._enqueue(entry):
+                break
+
+    # --- Fila ---
+
+    def _enqueue(self, entry: Dict) -> bool:
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self._spilled = True
+            self.stats["spilled"] += 1
+            return False
+        self._queued_ids.add(entry["id"])
+        self._ensure_worker()
+        return True
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+                self._worker.start()
+
+    def submit(self, content: str, source_type: str, metadata: Dict = None, thread_id: str = "system") -> bool:
+        """Enfileira um documento sem bloquear. Com a fila cheia, ele fica no spool e entra assim que houver espaço."""
+        if not content:
+            return False
+        entry = {
+            "id": uuid.uuid4().hex,
+            "doc": {"content": content, "source_type": source_type, "metadata": metadata or {}, "thread_id": thread_id}
+        }
+        self.stats["submitted"] += 1
+        with self._spool_lock:
+            self._append_spool(entry)
+            return self._enqueue(entry)
+
+    def _next_batch(self) -> List[Dict]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + Config.INGEST_FLUSH_INTERVAL
+        while len(batch) < Config.INGEST_FLUSH_DOCS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _refill(self):
+        # Documentos que não couberam na fila ficaram só no spool; entram quando ela esvazia.
+        with self._spool_lock:
+            self._spilled = False
+            for entry in self._pending_spool():
+                if entry["id"] not in self._queued_ids and not self._enqueue(entry):
+                    break
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                documents = [dict(entry["doc"], key=entry["id"]) for entry in batch]
+                ingested = set(self.memory.ingest_many(documents, report=False))
+                self.stats["ingested"] += len(ingested)
+                self.stats["failed"] += len(batch) - len(ingested)
+                self.stats["batches"] += 1
+                # Os que falharam ficam sem marca "done" e voltam na próxima inicialização.
+                self._append_spool({"done": [entry["id"] for entry in batch if entry["id"] in ingested]})
+            except Exception as e:
+                print(f"[MEMORY] Falha no lote de ingestão em segundo plano: {e}")
+                self.stats["failed"] += len(batch)
+            finally:
+                for entry in batch:
+                    self._queued_ids.discard(entry["id"])
+                if self._spilled and self.queue.empty():
+                    self._refill()
+                if self.queue.empty():
+                    self._compact_spool()
+                for entry in batch:
+                    self.queue.task_done()
+
+    # --- Flush ---
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até a fila esvaziar (inclusive documentos que estavam no spool). Retorna False se o timeout expirar."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self.queue.all_tasks_done:
+                while self.queue.unfinished_tasks:
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.queue.all_tasks_done.wait(remaining)
+            if not self._spilled:
+                return True
+            time.sleep(0.05)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        return await asyncio.to_thread(self.flush, timeout)
+
+    def status(self) -> Dict:
+        return dict(self.stats, queued=self.queue.qsize(), capacity=self.queue.maxsize)
@@ -0,0 +1,117 @@
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    rowid INTEGER PRIMARY KEY,
+    chunk_id TEXT UNIQUE NOT NULL,
+    thread_id TEXT,
+    domain TEXT,
+    source_type TEXT,
+    content TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    content, content='chunks', content_rowid='rowid', tokenize="unicode61 remove_diacritics 2 tokenchars '._-'"
+);
+CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts(chunks_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+"""
+
+# Palavras funcionais (pt/en) não discriminam nada no BM25 e, num OR, só trazem ruído.
+STOPWORDS = frozenset("""
+a o e é de da do das dos em no na nos nas um uma uns umas para pra por com sem que se como mais mas ou ao aos à às
+eu tu ele ela nós eles elas me te lhe meu minha seu sua isso isto esse essa este esta aquele aquela qual quais quando
+onde porque não sim já foi ser ter está estão há tem pelo pela pelos pelas entre sobre até também muito
+the an and or of to in on at for with by from is are was were be been it its this that these those as not no
+what which who when where why how do does did can could should would will my your our their there here
+""".split())
+
+def query_terms(query: str) -> List[str]:
+    """Termos úteis da consulta: sem stopwords e sem palavras de 1-2 letras (identificadores com dígitos, '.', '_' ou '-' ficam)."""
+    terms = []
+    for raw in re.findall(r"[\w.-]+", query or ""):
+        term = raw.strip(".-")
+        if not term or term.lower() in STOPWORDS:
+            continue
+        if len(term) < 3 and term.isalpha():
+            continue
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+class LexicalIndex:
+    """
+    Índice esparso (FTS5/BM25) espelhando os chunks do vector store, para consultas com identificadores,
+    nomes de arquivo e códigos de erro que a busca densa perde. Pontos, '_' e '-' fazem parte dos tokens.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    # A conexão é compartilhada entre threads: leituras também passam pelo lock.
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def upsert(self, texts: List[str], metadatas: List[Dict], ids: List[str]):
+        rows = [
+            (chunk_id, meta.get("thread_id"), meta.get("domain"), meta.get("source_type"), text)
+            for text, meta, chunk_id in zip(texts, metadatas, ids)
+        ]
+        with self._lock, self.conn:
+            # Passa pelo DELETE para o trigger manter o FTS em sincronia (INSERT OR REPLACE não dispara o delete).
+            self.conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            self.conn.executemany(
+                "INSERT INTO chunks (chunk_id, thread_id, domain, source_type, content) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def delete(self, ids: List[str]):
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+
+    def lookup(self, ids: List[str]) -> Dict[str, Dict]:
+        """Metadados (thread, domínio, tipo) dos chunks informados que existem no índice."""
+        found: Dict[str, Dict] = {}
+        for i in range(0, len(ids), 500):
+            group = ids[i:i + 500]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT chunk_id, thread_id, domain, source_type FROM chunks WHERE chunk_id IN ({', '.join('?' * len(group))})", group
+                ).fetchall()
+            found.update((row["chunk_id"], dict(row)) for row in rows)
+        return found
+
+    def search(self, query: str, k: int = 10, thread_id: Optional[str] = None, domains: Optional[List[str]] = None) -> List[Dict]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        expression = " OR ".join(f'"{t}"' for t in terms)
+        scope, params = "", [expression]
+        if thread_id:
+            scope = " AND (c.thread_id IN (?, 'system') OR c.domain = 'system')"
+            params.append(thread_id)
+        if domains:
+            scope += f" AND c.domain IN ({', '.join('?' * len(domains))})"
+            params.extend(domains)
+        with self._lock:
+            rows = self.conn.execute(
+                f"""SELECT c.chunk_id, c.thread_id, c.domain, c.source_type, c.content, bm25(chunks_fts) AS score
+                    FROM chunks_fts JOIN chunks c ON c.rowid = chunks_fts.rowid
+                    WHERE chunks_fts MATCH ?{scope}
+                    ORDER BY score LIMIT ?""",
+                params + [k]
+            ).fetchall()
+        return [dict(row) for row in rows]
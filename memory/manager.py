@@ -1,15 +1,25 @@
 import os
-import json
 import time
+import contextlib
 import uuid
 import hashlib
 import datetime
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Collection
 
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter, Language
 from core.config import Config
+from core.tracing import Tracer
+from memory.manifest import IngestionManifest
+from memory.episodic import EpisodicStore
+from memory.embedding_cache import CachedEmbeddings
+from memory.embedders import LazyEmbedder, embedder_name
+from memory.lexical_index import LexicalIndex
+from memory.dedup import NearDuplicateIndex, source_of
+from memory.chunking import ChunkingEngine, split_document, split_pool
+
+SYNCED_SOURCE_TYPES = ("file_content", "system_source_code")
 
 class DomainClassifier:
     
@@ -41,136 +51,508 @@ class DomainClassifier:
             
         return "general"
 
-class ChunkingEngine:
+class VectorStoreAdapter:
+    """
+    Memória vetorial particionada: uma coleção Chroma por domínio (e, opcionalmente, uma por thread para
+    as conversas). Escritas vão para o shard do chunk; buscas embutem a consulta uma vez e consultam em
+    paralelo só os shards relevantes, juntando os resultados pela distância. Cada shard tem seus próprios
+    parâmetros HNSW e é compactado sozinho quando acumula remoções.
+    Cada shard registra nos metadados o embedder que gerou seus vetores; shards de outro embedder (troca de
+    backend, ex.: HF fp32 -> ONNX int8) ficam fora das buscas até serem reembutidos por reembed_stale().
+    """
+    LEGACY_COLLECTION = "langchain"
+    PREFIX = "mem-"
+    # Thread dos chunks visíveis de todas as threads (arquivos da base de conhecimento).
+    SHARED_THREAD = "system"
+    COMPACT_SUFFIX = "-compact"
+    OLD_SUFFIX = "-old"
+
+    def __init__(self, persist_dir: str, embedder=None):
+        # Importado aqui para que carregar o módulo não puxe chromadb; o modelo só carrega no primeiro embed.
+        import chromadb
+
+        embedder = embedder or LazyEmbedder()
+        self.embedder = CachedEmbeddings(embedder, embedder.name)
+        self.client = chromadb.PersistentClient(path=persist_dir)
+        self.lexical = LexicalIndex(os.path.join(Config.DIRS["knowledge"], "lexical_index.sqlite"))
+        self.dedup = NearDuplicateIndex(os.path.join(Config.DIRS["knowledge"], "dedup_index.sqlite"))
+        self.shard_pool = ThreadPoolExecutor(max_workers=Config.SHARD_WORKERS, thread_name_prefix="memory-shard")
+        self._shards: Dict[str, Any] = {}
+        self._shard_lock = threading.RLock()
+        # Escritas e compactação são exclusivas: uma escrita no meio da cópia se perderia na troca de coleção.
+        self._write_lock = threading.RLock()
+        self.deleted: Dict[str, int] = {}
+        self._recover_compactions()
+        for collection in self.client.list_collections():
+            name = getattr(collection, "name", collection)
+            if name.startswith(self.PREFIX):
+                self._shards[name[len(self.PREFIX):]] = self.client.get_collection(name)
+        self.stale = {name for name, collection in self._shards.items() if self._embedder_of(collection) != self.embedder.model_name}
+        if self.stale:
+            print(f"[MEMORY] Shards gerados por outro embedder, fora das buscas até serem reembutidos: {', '.join(sorted(self.stale))}")
+        # Gerações por shard e por (shard, thread), incrementadas a cada escrita ou remoção: um resultado de busca
+        # só fica obsoleto quando muda o que ela consultou (o shard inteiro ou só a thread dela, conforme o filtro).
+        # `epoch` cobre mudanças em todos os shards (migração, backfill, ids desconhecidos).
+        self.generation = 0
+        self.generations: Dict[Any, int] = {}
+        self.epoch = 0
+        self._generation_lock = threading.Lock()
+
+    def _bump_generation(self, scopes: Optional[Iterable[tuple]] = None):
+        """scopes: pares (shard, thread_id) alterados; None invalida tudo."""
+        with self._generation_lock:
+            self.generation += 1
+            if scopes is None:
+                self.epoch += 1
+                return
+            for scope in set(scopes):
+                for key in (scope[0], scope):
+                    self.generations[key] = self.generations.get(key, 0) + 1
+
+    def generation_for(self, thread_id: Optional[str] = None, domains: Optional[List[str]] = None) -> tuple:
+        """Versão do que uma busca com esse filtro enxerga: muda só quando muda um dos shards (ou threads) roteados."""
+        keys = sorted(
+            (key for name, _, where in self._route(thread_id, domains)
+             for key in ([(name, t) for t in where["thread_id"]["$in"]] if where else [name])),
+            key=str
+        )
+        with self._generation_lock:
+            return (self.epoch, tuple((key, self.generations.get(key, 0)) for key in keys))
+
+    # --- Shards ---
+
     @staticmethod
-    def split(text: str, domain: str, metadata: Dict) -> List[str]:
-        chunk_size = metadata.get("chunk_size", 1000)
-        chunk_overlap = metadata.get("chunk_overlap", 200)
+    def _embedder_of(collection) -> Optional[str]:
+        return (collection.metadata or {}).get("embedder")
 
-        if domain == "code":
-            filename = metadata.get("filename", "")
-            ext = os.path.splitext(filename)[1].lower() if filename else ""
-            
-            lang_map = {
-                ".py": Language.PYTHON, ".js": Language.JS, ".ts": Language.TS,
-                ".tsx": Language.TS, ".java": Language.JAVA, ".cpp": Language.CPP,
-                ".go": Language.GO, ".rs": Language.RUST, ".php": Language.PHP,
-                ".rb": Language.RUBY, ".html": Language.HTML, 
-                ".md": Language.MARKDOWN, ".sol": Language.SOL
-            }
-            language = lang_map.get(ext)
-            
-            if language:
-                splitter = RecursiveCharacterTextSplitter.from_language(
-                    language=language,
-                    chunk_size=chunk_size,
-                    chunk_overlap=chunk_overlap
+    @staticmethod
+    def shard_for(metadata: Dict) -> str:
+        thread_id = metadata.get("thread_id")
+        if Config.SHARD_CHAT_BY_THREAD and metadata.get("source_type") == "chat_interaction" and thread_id:
+            return "thread-" + hashlib.sha1(str(thread_id).encode("utf-8")).hexdigest()[:12]
+        domain = metadata.get("domain")
+        return domain if domain in Config.MEMORY_SHARDS else "general"
+
+    def _shard(self, name: str):
+        with self._shard_lock:
+            collection = self._shards.get(name)
+            if collection is None:
+                kind = "thread" if name.startswith("thread-") else name
+                hnsw = Config.SHARD_HNSW.get(kind, Config.SHARD_HNSW["default"])
+                collection = self.client.get_or_create_collection(
+                    self.PREFIX + name, metadata={"hnsw:space": "cosine", **hnsw, "embedder": self.embedder.model_name}
                 )
-                return splitter.split_text(text)
-            
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
-        return splitter.split_text(text)
-
-class EpisodicStore:
-    def __init__(self, base_path: str):
-        self.base_path = base_path
-        if not os.path.exists(self.base_path):
-            os.makedirs(self.base_path)
-
-    def log(self, event_id: str, content: str, type: str, meta: Dict):
-        entry = {
-            "id": event_id,
-            "timestamp": meta.get("timestamp", time.time()),
-            "iso_time": meta.get("iso_time", datetime.datetime.now().isoformat()),
-            "type": type,
-            "thread_id": meta.get("thread_id", "unknown"),
-            "domain": meta.get("domain", "general"),
-            "content": content,
-            "metadata": meta
+                self._shards[name] = collection
+            return collection
+
+    def shards(self) -> Dict[str, Any]:
+        with self._shard_lock:
+            return dict(self._shards)
+
+    def shard_stats(self) -> Dict[str, Dict]:
+        return {
+            name: {"count": collection.count(), "deleted": self.deleted.get(name, 0), "stale": name in self.stale}
+            for name, collection in self.shards().items()
         }
 
-        fname = os.path.join(self.base_path, f"{int(entry['timestamp']*1000)}_{type}.json")
-        try:
-            with open(fname, "w", encoding="utf-8") as f:
-                json.dump(entry, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"[MEMORY] Failed to write episodic log: {e}")
+    def _route(self, thread_id: Optional[str], domains: Optional[List[str]]) -> List[tuple]:
+        """
+        Shards a consultar com o filtro de cada um. Com thread, vale o que era o $or antigo (a thread ou o domínio
+        system) mais o que foi ingerido para todas as threads (a base de conhecimento, thread SHARED_THREAD).
+        """
+        routes = []
+        own_thread = self.shard_for({"source_type": "chat_interaction", "thread_id": thread_id}) if thread_id else None
+        for name, collection in self.shards().items():
+            if name in self.stale:
+                continue
+            if name.startswith("thread-"):
+                # Shards de thread guardam conversas, que são do domínio general.
+                if (thread_id is None or name == own_thread) and (domains is None or "general" in domains):
+                    routes.append((name, collection, None))
+                continue
+            if domains is not None and name not in domains:
+                continue
+            threads = [thread_id, self.SHARED_THREAD] if thread_id and thread_id != self.SHARED_THREAD else [thread_id]
+            routes.append((name, collection, {"thread_id": {"$in": threads}} if thread_id and name != "system" else None))
+        return routes
 
-    def get_recent(self, limit: int = 10) -> List[Dict]:
-        try:
-            files = sorted(os.listdir(self.base_path), reverse=True)[:limit]
-            history = []
-            for f in files:
-                try:
-                    with open(os.path.join(self.base_path, f), "r", encoding="utf-8") as fd:
-                        history.append(json.load(fd))
-                except: pass
-            return history[::-1]
-        except:
-            return []
+    def migrate_legacy(self, page_size: int = 1000) -> int:
+        """
+        Redistribui a coleção única antiga entre os shards. Ela foi gerada pelo embedder HuggingFace fp32: os vetores
+        só são reaproveitados se o embedder atual for o mesmo; senão, são recalculados (os shards rotulam o atual).
+        """
+        names = {getattr(c, "name", c) for c in self.client.list_collections()}
+        if self.LEGACY_COLLECTION not in names:
+            return 0
+        legacy = self.client.get_collection(self.LEGACY_COLLECTION)
+        reembed = self.embedder.model_name != embedder_name("huggingface")
+        include = ["documents", "metadatas"] if reembed else ["documents", "metadatas", "embeddings"]
+        total = legacy.count()
+        offset = 0
+        while True:
+            page = legacy.get(limit=page_size, offset=offset, include=include)
+            ids = page.get("ids", [])
+            if not ids:
+                break
+            metadatas = page.get("metadatas") or [{}] * len(ids)
+            embeddings = self.embedder.embed_documents(page["documents"]) if reembed else page["embeddings"]
+            self._upsert(page["documents"], metadatas, ids, embeddings)
+            offset += len(ids)
+            print(f"[MEMORY] Migrando coleção única para shards: {offset}/{total} chunks")
+        self.client.delete_collection(self.LEGACY_COLLECTION)
+        self._bump_generation()
+        return offset
 
-class VectorStoreAdapter:
-    def __init__(self, persist_dir: str):
-        self.embedder = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        self.chroma = Chroma(
-            persist_directory=persist_dir,
-            embedding_function=self.embedder,
-            collection_metadata={"hnsw:space": "cosine"}
+    def _recover_compactions(self):
+        """
+        Desfaz compactações interrompidas. "-old" é o shard original durante a troca: se o novo já tem o nome
+        definitivo, sobra para apagar; senão, volta a ser o shard. "-compact" é uma cópia incompleta e é descartada.
+        """
+        names = {getattr(c, "name", c) for c in self.client.list_collections()}
+        for name in sorted(names):
+            if name.startswith(self.PREFIX) and name.endswith(self.OLD_SUFFIX):
+                original = name[:-len(self.OLD_SUFFIX)]
+                if original in names:
+                    self.client.delete_collection(name)
+                else:
+                    self.client.get_collection(name).modify(name=original)
+                    names.add(original)
+                    print(f"[MEMORY] Compactação interrompida: shard {original[len(self.PREFIX):]} restaurado.")
+        for name in sorted(names):
+            if name.startswith(self.PREFIX) and name.endswith(self.COMPACT_SUFFIX):
+                self.client.delete_collection(name)
+
+    def compact(self, name: str, reembed: bool = False) -> int:
+        """
+        Reconstrói o índice HNSW do shard copiando só os vetores vivos, descartando as remoções acumuladas.
+        Com reembed, os vetores são recalculados com o embedder atual em vez de copiados.
+        """
+        with self._write_lock:
+            return self._compact(name, reembed)
+
+    def _compact(self, name: str, reembed: bool = False) -> int:
+        source = self._shard(name)
+        target_name = self.PREFIX + name + self.COMPACT_SUFFIX
+        with contextlib.suppress(Exception):
+            # Sobra de uma compactação que falhou neste processo: recomeça do zero.
+            self.client.delete_collection(target_name)
+        target = self.client.get_or_create_collection(
+            target_name, metadata=dict(source.metadata or {}, embedder=self.embedder.model_name)
         )
+        offset, size = 0, Config.INGEST_BATCH_SIZE * 16
+        include = ["documents", "metadatas"] if reembed else ["documents", "metadatas", "embeddings"]
+        while True:
+            page = source.get(limit=size, offset=offset, include=include)
+            ids = page.get("ids", [])
+            if not ids:
+                break
+            embeddings = self.embedder.embed_documents(page["documents"]) if reembed else page["embeddings"]
+            target.upsert(ids=ids, embeddings=embeddings, documents=page["documents"], metadatas=page["metadatas"])
+            offset += len(ids)
+        # Troca sem janela sem shard: o original só é apagado depois que a cópia assumiu o nome dele.
+        with self._shard_lock:
+            source.modify(name=self.PREFIX + name + self.OLD_SUFFIX)
+            target.modify(name=self.PREFIX + name)
+            self.client.delete_collection(self.PREFIX + name + self.OLD_SUFFIX)
+            self._shards[name] = target
+            self.deleted[name] = 0
+            self.stale.discard(name)
+        self._bump_generation([(name, None)])
+        return offset
+
+    def reembed_stale(self) -> List[str]:
+        """Recalcula os vetores dos shards gerados por outro embedder e os devolve às buscas."""
+        done = []
+        for name in sorted(self.stale):
+            start = time.perf_counter()
+            kept = self.compact(name, reembed=True)
+            print(f"[MEMORY] Shard {name} reembutido com {self.embedder.model_name}: {kept} chunks em {time.perf_counter() - start:.1f}s")
+            done.append(name)
+        return done
+
+    def compact_shards(self) -> List[str]:
+        compacted = []
+        for name, collection in self.shards().items():
+            deleted = self.deleted.get(name, 0)
+            if deleted and deleted >= Config.SHARD_COMPACT_RATIO * max(collection.count(), 1):
+                kept = self.compact(name)
+                print(f"[MEMORY] Shard {name} compactado: {kept} chunks mantidos, {deleted} removidos descartados.")
+                compacted.append(name)
+        return compacted
+
+    # --- Escrita ---
+
+    @staticmethod
+    def sanitize_metadata(metadatas: List[Dict]) -> List[Dict]:
+        # Chroma só aceita escalares: descarta None e converte o resto para string.
+        return [
+            {k: (v if isinstance(v, (str, int, float, bool)) else str(v)) for k, v in meta.items() if v is not None}
+            for meta in metadatas
+        ]
+
+    def warmup(self):
+        if hasattr(self.embedder.inner, "load"):
+            self.embedder.inner.load()
+
+    def _upsert(self, texts: List[str], metadatas: List[Dict], ids: List[str], embeddings):
+        groups: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault(self.shard_for(meta or {}), []).append(i)
+        for name, rows in groups.items():
+            self._shard(name).upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                documents=[texts[i] for i in rows],
+                metadatas=[metadatas[i] or {} for i in rows]
+            )
 
     def add(self, text: str, metadata: Dict, doc_id: str):
-        clean_meta = {}
-        for k, v in metadata.items():
-            if v is None: continue
+        self.add_batch([text], [metadata], [doc_id])
 
-            if isinstance(v, (str, int, float, bool)):
-                clean_meta[k] = v
-            else:
-                clean_meta[k] = str(v)
-        
-        self.chroma.add_texts([text], metadatas=[clean_meta], ids=[doc_id])
+    def add_batch(self, texts: List[str], metadatas: List[Dict], ids: List[str]):
+        """Um forward pass do embedder por lote; cada lote é repartido entre os shards dos seus chunks."""
+        clean = self.sanitize_metadata(metadatas)
+        size = Config.INGEST_BATCH_SIZE
+        touched = {(self.shard_for(meta), meta.get("thread_id")) for meta in clean}
+        try:
+            with self._write_lock:
+                for i in range(0, len(texts), size):
+                    embeddings = self.embedder.embed_documents(texts[i:i + size])
+                    self._upsert(texts[i:i + size], clean[i:i + size], ids[i:i + size], embeddings)
+            self.lexical.upsert(texts, clean, ids)
+        finally:
+            # Mesmo uma escrita parcial muda o que as buscas nesses shards retornam. Shards obsoletos ficam fora
+            # das rotas densas mas não da busca léxica, então escrever neles invalida tudo.
+            self._bump_generation(None if any(name in self.stale for name, _ in touched) else touched)
+
+    def delete_batch(self, ids: List[str]):
+        # O índice léxico sabe o domínio/thread de cada chunk; ids desconhecidos são apagados de todos os shards.
+        known = self.lexical.lookup(ids)
+        groups: Dict[str, List[str]] = {}
+        for chunk_id in ids:
+            if chunk_id in known:
+                groups.setdefault(self.shard_for(known[chunk_id]), []).append(chunk_id)
+        unknown = [chunk_id for chunk_id in ids if chunk_id not in known]
+
+        size = Config.INGEST_BATCH_SIZE
+        try:
+            with self._write_lock:
+                shards = self.shards()
+                for name, shard_ids in groups.items():
+                    if name not in shards:
+                        continue
+                    for i in range(0, len(shard_ids), size):
+                        shards[name].delete(ids=shard_ids[i:i + size])
+                    self.deleted[name] = self.deleted.get(name, 0) + len(shard_ids)
+                for collection in shards.values() if unknown else ():
+                    for i in range(0, len(unknown), size):
+                        collection.delete(ids=unknown[i:i + size])
+            self.lexical.delete(ids)
+            self.dedup.delete(ids)
+        finally:
+            self._bump_generation(None if unknown else [(self.shard_for(known[i]), known[i].get("thread_id")) for i in ids])
+
+    def backfill_indexes(self, page_size: int = 1000) -> int:
+        """Popula os índices léxico e de quase-duplicatas com os chunks gravados no Chroma antes deles existirem."""
+        targets = [index for index in (self.lexical, self.dedup) if not index.count()]
+        if not targets:
+            return 0
+        total = 0
+        for collection in self.shards().values():
+            offset = 0
+            while True:
+                page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                ids = page.get("ids", [])
+                if not ids:
+                    break
+                for index in targets:
+                    index.upsert(page["documents"], page.get("metadatas") or [{}] * len(ids), ids)
+                offset += len(ids)
+            total += offset
+        if total:
+            self._bump_generation()
+            print(f"[MEMORY] Índices léxico/duplicatas populados com {total} chunks existentes.")
+        return total
+
+    def scan(self, where: Dict, page_size: int = 1000):
+        """Itera (id, metadados) dos chunks que casam com o filtro, paginando para não carregar os shards inteiros."""
+        for collection in self.shards().values():
+            offset = 0
+            while True:
+                page = collection.get(where=where, limit=page_size, offset=offset, include=["metadatas"])
+                ids = page.get("ids", [])
+                if not ids:
+                    break
+                yield from zip(ids, page.get("metadatas") or [{}] * len(ids))
+                offset += len(ids)
+
+    # --- Leitura ---
+
+    def count(self) -> int:
+        return sum(collection.count() for collection in self.shards().values())
+
+    @staticmethod
+    def _query_shard(collection, embedding: List[float], k: int, where: Optional[Dict]) -> List[tuple]:
+        size = collection.count()
+        if not size:
+            return []
+        result = collection.query(
+            query_embeddings=[embedding], n_results=min(k, size), where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        return list(zip(result["distances"][0], result["ids"][0], result["documents"][0], result["metadatas"][0]))
+
+    def search(self, query: str, k: int = 5, thread_id: Optional[str] = None, domains: Optional[List[str]] = None,
+               score_threshold: Optional[float] = None) -> List[Dict]:
+        if score_threshold is None:
+            score_threshold = Config.RETRIEVAL_SCORE_THRESHOLD
+        routes = self._route(thread_id, domains)
+        if not routes:
+            return []
+        embedding = self.embedder.embed_query(query)
+        futures = [self.shard_pool.submit(self._query_shard, collection, embedding, k, where) for _, collection, where in routes]
+        hits = []
+        for future in futures:
+            try:
+                hits.extend(future.result())
+            except Exception as e:
+                print(f"[MEMORY] Busca em shard falhou: {e}")
+        # Mesmo embedder e mesma métrica (cosseno) em todos os shards: as distâncias são comparáveis.
+        hits.sort(key=lambda hit: hit[0])
+        return [
+            {"id": (meta or {}).get("ingest_id") or chunk_id, "content": doc, "metadata": meta or {}}
+            for distance, chunk_id, doc, meta in hits[:k] if distance < score_threshold
+        ]
 
-    def search(self, query: str, k: int = 5, filters: Optional[Dict] = None, score_threshold: float = 0.4):
-        results = self.chroma.similarity_search_with_score(query, k=k, filter=filters)
-        return [doc for doc, score in results if score < score_threshold]
+    def lexical_search(self, query: str, k: int = 5, thread_id: Optional[str] = None, domains: Optional[List[str]] = None) -> List[Dict]:
+        return [
+            {"id": row["chunk_id"], "content": row["content"],
+             "metadata": {"source_type": row["source_type"], "thread_id": row["thread_id"], "domain": row["domain"]}}
+            for row in self.lexical.search(query, k=k, thread_id=thread_id, domains=domains)
+        ]
 
 class MemoryManager:
+    """
+    Inicialização preguiçosa: o log episódico fica pronto na hora; Chroma e o embedder sobem em segundo plano,
+    seguidos da sincronização. Até lá, retrieve devolve contexto vazio em vez de bloquear. Se a subida falhar,
+    é repetida MEMORY_WARMUP_ATTEMPTS vezes; esgotadas, state fica "failed" (com warmup_error) e a memória segue
+    só com o log episódico. wait_ready() espera até pronto ou falha definitiva e diz qual dos dois.
+    Passar vector_store e sync=False monta uma instância isolada, sem varrer a base de conhecimento (benchmarks).
+    """
     _instance = None
+    _lock = threading.Lock()
 
-    def __init__(self):
+    def __init__(self, vector_store: Optional[VectorStoreAdapter] = None, sync: bool = True):
         self.classifier = DomainClassifier()
         self.chunker = ChunkingEngine()
         
         for d in Config.DIRS.values():
             os.makedirs(d, exist_ok=True)
 
-        self.episodic = EpisodicStore(Config.DIRS["episodic"])
-        self.vector_store = VectorStoreAdapter(Config.DIRS["chroma"])
+        self.episodic = EpisodicStore.get_instance()
+        self.search_pool = ThreadPoolExecutor(max_workers=Config.RETRIEVAL_WORKERS, thread_name_prefix="memory-search")
+        # chave -> (geração dos shards roteados, contexto)
+        self.retrieval_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
         
-        self.ingested_path = os.path.join(Config.DIRS["knowledge"], ".ingested.json")
-        self.ingested_hashes = self._load_cache()
+        self.manifest = IngestionManifest(
+            os.path.join(Config.DIRS["knowledge"], ".manifest.json"),
+            legacy_path=os.path.join(Config.DIRS["knowledge"], ".ingested.json")
+        )
         
-        print("[MEMORY] Sincronizando base de conhecimento...")
-        self._sync_knowledge_base()
-        self._sync_codebase()
+        self.ready = threading.Event()
+        # Marcado quando a subida termina, com sucesso ou falha definitiva: ninguém espera por `ready` para sempre.
+        self._settled = threading.Event()
+        self.warmup_error: Optional[str] = None
+        self._vector_store: Optional[VectorStoreAdapter] = vector_store
+        self._vector_lock = threading.Lock()
+        self.sync_thread = threading.Thread(target=self._warmup, kwargs={"sync": sync}, name="memory-sync", daemon=True)
+        self.sync_thread.start()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
 
-    def ingest_universal(self, content: str, source_type: str, metadata: Dict = None, thread_id: str = "system"):
-        if not content: return
+    @property
+    def vector_store(self) -> VectorStoreAdapter:
+        if self._vector_store is None:
+            with self._vector_lock:
+                if self._vector_store is None:
+                    self._vector_store = VectorStoreAdapter(Config.DIRS["chroma"])
+        return self._vector_store
+
+    @property
+    def embedder_name(self) -> str:
+        return embedder_name()
+
+    @property
+    def state(self) -> str:
+        if self.ready.is_set():
+            return "ready"
+        return "failed" if self._settled.is_set() else "warming"
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Espera a subida terminar (ou o timeout) e diz se a memória vetorial está pronta."""
+        self._settled.wait(timeout)
+        return self.ready.is_set()
+
+    def _warmup(self, sync: bool = True):
+        attempts = max(1, Config.MEMORY_WARMUP_ATTEMPTS)
+        for attempt in range(1, attempts + 1):
+            start = time.perf_counter()
+            try:
+                self.vector_store.warmup()
+                self.vector_store.migrate_legacy()
+                break
+            except Exception as e:
+                self.warmup_error = f"{type(e).__name__}: {e}"
+                print(f"[MEMORY] Falha ao iniciar a memória vetorial (tentativa {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    time.sleep(Config.MEMORY_WARMUP_RETRY_DELAY * attempt)
+        else:
+            print("[MEMORY] Memória vetorial indisponível; recuperação seguirá vazia, só o log episódico funciona.")
+            self._settled.set()
+            return
+        self.warmup_error = None
+        self.ready.set()
+        self._settled.set()
+        print(f"[MEMORY] Memória vetorial pronta em {time.perf_counter() - start:.2f}s")
+        if sync:
+            self.sync()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.vector_store.embedder.embed_documents(texts)
+
+    def stats(self) -> Dict:
+        if not self.ready.is_set():
+            return {"ready": False, "state": self.state, "error": self.warmup_error, "indexed_files": len(self.manifest.entries)}
+        return {
+            "ready": True,
+            "state": self.state,
+            "embeddings": self.vector_store.embedder.stats(),
+            "shards": self.vector_store.shard_stats(),
+            "duplicates_suppressed": self.vector_store.dedup.suppressed(),
+            "retrieval_cache": dict(self.cache_stats, entries=len(self.retrieval_cache), generation=self.vector_store.generation),
+            "indexed_files": len(self.manifest.entries)
+        }
+
+    @staticmethod
+    def path_doc_id(path: str) -> str:
+        # Id estável por caminho: ao reingerir um arquivo os chunks de mesmo índice são sobrescritos (upsert).
+        return "file_" + hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+    def _prepare(self, content: str, source_type: str, metadata: Dict = None, thread_id: str = "system", doc_id: Optional[str] = None,
+                 chunks: Optional[List[str]] = None) -> List[tuple]:
+        """Registra o episódio e devolve os chunks (texto, metadados, id) prontos para o vector store; `chunks` pula a divisão."""
         if metadata is None: metadata = {}
         
         domain = self.classifier.infer(source_type, metadata)
         timestamp = time.time()
-        base_id = str(uuid.uuid4())
+        base_id = doc_id or str(uuid.uuid4())
         
         rich_metadata = metadata.copy()
         rich_metadata.update({
@@ -185,102 +567,367 @@ class MemoryManager:
         
         self.episodic.log(base_id, content, source_type, rich_metadata)
         
-        if content:
+        if chunks is None:
             chunks = self.chunker.split(content, domain, rich_metadata)
-            
-            for i, chunk in enumerate(chunks):
-                chunk_meta = rich_metadata.copy()
-                chunk_meta["chunk_index"] = i
-                chunk_meta["total_chunks"] = len(chunks)
-                chunk_meta["ingest_id"] = f"{base_id}_{i}" 
-                
-                self.vector_store.add(chunk, chunk_meta, chunk_meta["ingest_id"])
-
-    def retrieve(self, query: str, k: int = 5, thread_id: Optional[str] = None) -> str:
-        filters = None
-        if thread_id:
-            filters = {
-                "$or": [
-                    {"thread_id": {"$eq": thread_id}},
-                    {"domain": {"$eq": "system"}}
-                ]
-            }
-        docs = self.vector_store.search(query, k=k, filters=filters)
+        prepared = []
+        for i, chunk in enumerate(chunks):
+            chunk_meta = rich_metadata.copy()
+            chunk_meta["chunk_index"] = i
+            chunk_meta["total_chunks"] = len(chunks)
+            chunk_meta["ingest_id"] = f"{base_id}_{i}" 
+            prepared.append((chunk, chunk_meta, chunk_meta["ingest_id"]))
+        return prepared
+
+    def ingest_universal(self, content: str, source_type: str, metadata: Dict = None, thread_id: str = "system"):
+        if not content: return
+        self.ingest_many([{"content": content, "source_type": source_type, "metadata": metadata, "thread_id": thread_id}], report=False)
+
+    def ingest_many(self, documents: Iterable[Dict], report: bool = True) -> Dict[Any, List[str]]:
+        """
+        Ingere vários documentos acumulando os chunks em lotes de INGEST_BATCH_SIZE.
+        Cada documento é um dict com content, source_type e, opcionalmente, metadata, thread_id, key, doc_id, chunks (já divididos)
+        e replaces (ids da versão anterior do documento, que será apagada).
+        Retorna {key: ids dos chunks} dos documentos cujos chunks foram todos gravados.
+        Chunks quase idênticos a um já gravado da mesma origem (arquivo ou thread) são descartados e não entram na lista.
+        """
+        texts, metas, ids, owners = [], [], [], []
+        keys, chunk_ids, failed = [], [], set()
+        total_chunks = duplicates = 0
+        start = time.perf_counter()
+
+        def flush():
+            nonlocal total_chunks
+            if not texts: return
+            try:
+                self.vector_store.add_batch(texts, metas, ids)
+                total_chunks += len(texts)
+            except Exception as e:
+                print(f"[MEMORY] Falha ao gravar lote de {len(texts)} chunks: {e}")
+                self.vector_store.dedup.delete(ids)
+                failed.update(owners)
+            texts.clear(); metas.clear(); ids.clear(); owners.clear()
+
+        with Tracer.get_instance().span("ingest", kind="ingest") as span:
+            for doc in documents:
+                if not doc.get("content"): continue
+                idx = len(keys)
+                keys.append(doc.get("key"))
+                chunk_ids.append([])
+                try:
+                    prepared = self._prepare(doc["content"], doc.get("source_type", "unknown"), doc.get("metadata"), doc.get("thread_id", "system"), doc.get("doc_id"), doc.get("chunks"))
+                except Exception as e:
+                    print(f"[MEMORY] Falha ao preparar documento {doc.get('key') or ''}: {e}")
+                    failed.add(idx)
+                    continue
+                replaces = set(doc.get("replaces") or ())
+                for chunk, meta, chunk_id in prepared:
+                    if self._duplicate_of(chunk, meta, chunk_id, replaces, chunk_ids[idx]):
+                        duplicates += 1
+                        continue
+                    chunk_ids[idx].append(chunk_id)
+                    texts.append(chunk); metas.append(meta); ids.append(chunk_id); owners.append(idx)
+                    if len(texts) >= Config.INGEST_BATCH_SIZE:
+                        flush()
+            flush()
+
+            elapsed = time.perf_counter() - start
+            rate = total_chunks / elapsed if elapsed > 0 else 0.0
+            span.set(documents=len(keys), chunks=total_chunks, duplicates=duplicates, chunks_per_sec=round(rate, 1))
+
+        if report and keys:
+            print(f"[MEMORY] {len(keys)} documentos, {total_chunks} chunks ({duplicates} duplicados descartados) em {elapsed:.2f}s ({rate:.1f} chunks/s)")
+        return {key: chunk_ids[i] for i, key in enumerate(keys) if i not in failed}
+
+    def _duplicate_of(self, chunk: str, meta: Dict, chunk_id: str, replaces: Collection[str] = (),
+                      registered: Collection[str] = ()) -> Optional[str]:
+        """
+        Id do chunk já gravado de que este é quase-duplicata (SimHash + LSH), ou None após registrá-lo.
+        A versão anterior do mesmo documento (ids com o mesmo prefixo e `replaces`, os chunk_ids do manifesto) não
+        conta: ela vai ser sobrescrita ou apagada. Dentro da versão nova, `registered` são os chunks já gravados.
+        """
+        if not Config.DEDUP_ENABLED or len(chunk) < Config.DEDUP_MIN_CHARS:
+            return None
+        return self.vector_store.dedup.check_and_add(
+            chunk_id, chunk, source_of(meta), exclude_prefix=f"{meta['ingest_base_id']}_",
+            exclude_ids=replaces, keep_ids=registered
+        )
+
+    def retrieve(self, query: str, k: int = 5, thread_id: Optional[str] = None, domains: Optional[List[str]] = None) -> str:
+        with Tracer.get_instance().span("retrieve", kind="retrieval", k=k, chars=len(query or "")) as span:
+            if not self.ready.is_set():
+                span.set(degraded=True, memory_state=self.state, output_chars=0)
+                return ""
+            # A geração dos shards roteados é lida antes da busca: se algum for escrito no meio, o resultado não é guardado.
+            generation = self.vector_store.generation_for(thread_id, domains)
+            key = ((query or "").strip(), k, thread_id, tuple(sorted(domains)) if domains else None)
+            context = self._cache_get(generation, key)
+            if context is not None:
+                span.set(cache="hit", output_chars=len(context))
+                return context
+            context, complete = self._retrieve(query, k=k, thread_id=thread_id, domains=domains)
+            if complete:
+                self._cache_put(generation, key, context, thread_id, domains)
+            span.set(cache="miss", output_chars=len(context))
+            return context
+
+    def _cache_get(self, generation: tuple, key: tuple) -> Optional[str]:
+        with self._cache_lock:
+            entry = self.retrieval_cache.get(key)
+            if entry is not None and entry[0] != generation:
+                # Um dos shards que a busca consultou mudou desde que ela foi guardada.
+                del self.retrieval_cache[key]
+                self.cache_stats["invalidations"] += 1
+                entry = None
+            if entry is None:
+                self.cache_stats["misses"] += 1
+                return None
+            self.retrieval_cache.move_to_end(key)
+            self.cache_stats["hits"] += 1
+            return entry[1]
+
+    def _cache_put(self, generation: tuple, key: tuple, context: str, thread_id: Optional[str], domains: Optional[List[str]]):
+        if generation != self.vector_store.generation_for(thread_id, domains):
+            return
+        with self._cache_lock:
+            self.retrieval_cache[key] = (generation, context)
+            self.retrieval_cache.move_to_end(key)
+            while len(self.retrieval_cache) > Config.RETRIEVAL_CACHE_SIZE:
+                self.retrieval_cache.popitem(last=False)
+
+    @staticmethod
+    def fuse(rankings: List[List[Dict]], k: int, rrf_k: int = 60) -> List[Dict]:
+        """Reciprocal Rank Fusion: soma 1/(rrf_k + posição) de cada lista em que o chunk aparece."""
+        scores: Dict[str, float] = {}
+        items: Dict[str, Dict] = {}
+        for ranking in rankings:
+            for position, item in enumerate(ranking):
+                scores[item["id"]] = scores.get(item["id"], 0.0) + 1.0 / (rrf_k + position + 1)
+                items.setdefault(item["id"], item)
+        ordered = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [items[chunk_id] for chunk_id in ordered]
+
+    def _retrieve(self, query: str, k: int = 5, thread_id: Optional[str] = None, domains: Optional[List[str]] = None) -> Tuple[str, bool]:
+        """Retorna (contexto, completo); incompleto se alguma busca estourou o orçamento ou falhou."""
+        # Busca densa (nos shards da thread/domínios) e léxica em paralelo; o que não responder dentro do orçamento fica de fora da fusão.
+        candidates = k * Config.RETRIEVAL_CANDIDATES
+        futures = {
+            self.search_pool.submit(self.vector_store.search, query, candidates, thread_id, domains): "dense",
+            self.search_pool.submit(self.vector_store.lexical_search, query, candidates, thread_id, domains): "lexical"
+        }
+        done, _ = wait(futures, timeout=Config.RETRIEVAL_BUDGET_MS / 1000)
+        if not done:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+        rankings = []
+        for future in done:
+            try:
+                rankings.append(future.result())
+            except Exception as e:
+                print(f"[MEMORY] Busca {futures[future]} falhou: {e}")
+        complete = len(rankings) == len(futures)
+        docs = self.fuse(rankings, k)
         
         if not docs:
-            return ""
+            return "", complete
 
         context_parts = []
         for doc in docs:
-            src = doc.metadata.get("source_type", "unknown")
+            src = doc["metadata"].get("source_type", "unknown")
             entry = (
-                f"<memory_entry source='{src}' thread='{doc.metadata.get('thread_id')}'>\n"
-                f"{doc.page_content}\n"
+                f"<memory_entry source='{src}' thread='{doc['metadata'].get('thread_id')}'>\n"
+                f"{doc['content']}\n"
                 f"</memory_entry>"
             )
             context_parts.append(entry)
             
-        return "<memory_context>\n" + "\n".join(context_parts) + "\n</memory_context>"
+        return "<memory_context>\n" + "\n".join(context_parts) + "\n</memory_context>", complete
 
-    def _load_cache(self):
-        if os.path.exists(self.ingested_path):
+    def sync(self, periodic: bool = True):
+        print("[MEMORY] Sincronizando base de conhecimento...")
+        while True:
+            try:
+                self.vector_store.reembed_stale()
+                self.vector_store.backfill_indexes()
+                self._sync_knowledge_base()
+                self._sync_codebase()
+                self.reconcile()
+                self.vector_store.compact_shards()
+            except Exception as e:
+                print(f"[MEMORY] Falha na sincronização: {e}")
+            if not periodic or not Config.RECONCILE_INTERVAL:
+                return
+            time.sleep(Config.RECONCILE_INTERVAL)
+
+    def reconcile(self) -> int:
+        """
+        Remove do vector store chunks de arquivos que sumiram do disco e chunks órfãos
+        (de arquivos sincronizados que não constam mais no manifesto).
+        """
+        stale = set()
+        for path, entry in list(self.manifest.entries.items()):
+            if not os.path.exists(path):
+                stale.update(entry.get("chunk_ids", []))
+                self.manifest.remove(path)
+
+        known = {chunk_id for entry in self.manifest.entries.values() for chunk_id in entry.get("chunk_ids", [])}
+        adopted = {}
+        for chunk_id, meta in self.vector_store.scan({"source_type": {"$in": list(SYNCED_SOURCE_TYPES)}}):
+            if chunk_id in known:
+                continue
+            path = (meta or {}).get("path")
+            entry = self.manifest.get(path) if path else None
+            if entry is not None and not entry.get("chunk_ids") and os.path.exists(path):
+                # Entradas migradas do .ingested.json não sabem seus chunks: adota os existentes em vez de apagá-los.
+                adopted.setdefault(path, []).append(chunk_id)
+            else:
+                stale.add(chunk_id)
+
+        for path, ids in adopted.items():
+            self.manifest.entries[path]["chunk_ids"] = ids
+
+        if stale:
+            self.vector_store.delete_batch(sorted(stale))
+            print(f"[MEMORY] Reconciliação removeu {len(stale)} chunks obsoletos.")
+        if stale or adopted:
+            self.manifest.save()
+        return len(stale)
+
+    def _sync_files(self, paths: Iterable[str], make_doc) -> int:
+        """
+        Sincroniza um conjunto de arquivos com o manifesto. Arquivos com (mtime, size) inalterados custam
+        um stat; os demais são lidos e hasheados em paralelo e só reingeridos se o conteúdo mudou.
+        Lotes grandes são divididos em chunks num pool de processos (spawn): a divisão é Python puro e, em threads,
+        disputaria o GIL com a sincronização e a interface.
+        """
+        changed = []
+        for path in paths:
             try:
-                with open(self.ingested_path, "r", encoding="utf-8") as f: return set(json.load(f))
-            except: return set()
-        return set()
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not self.manifest.is_unchanged(path, st):
+                changed.append((path, st))
 
-    def _save_cache(self):
-        with open(self.ingested_path, "w", encoding="utf-8") as f: json.dump(list(self.ingested_hashes), f)
+        ingested = 0
+        size = Config.SYNC_READ_BATCH
+        split_pool = self._split_pool() if len(changed) >= Config.SPLIT_MIN_DOCS else None
+        with ThreadPoolExecutor(max_workers=Config.SYNC_WORKERS, thread_name_prefix="memory-hash") as pool, \
+                (split_pool or contextlib.nullcontext()):
+            for i in range(0, len(changed), size):
+                group = changed[i:i + size]
+                results = list(pool.map(self._read_and_hash, [path for path, _ in group]))
+
+                pending = {}
+                documents = []
+                for (path, st), result in zip(group, results):
+                    if result is None: continue
+                    content, file_hash = result
+                    if self.manifest.known_hash(path, file_hash):
+                        # Só o mtime mudou (ou o arquivo veio do .ingested.json legado): nada a reingerir.
+                        self.manifest.update(path, st, file_hash)
+                        continue
+                    pending[path] = (st, file_hash)
+                    # replaces: chunks da versão anterior (inclusive ids uuid legados), que não contam como originais na deduplicação.
+                    previous_ids = (self.manifest.get(path) or {}).get("chunk_ids", [])
+                    documents.append(dict(make_doc(path, content), key=path, doc_id=self.path_doc_id(path), replaces=previous_ids))
+
+                if split_pool is not None and len(documents) > 1:
+                    self._split_documents(split_pool, documents)
+
+                stale = []
+                for path, ids in self.ingest_many(documents).items():
+                    st, file_hash = pending[path]
+                    previous = self.manifest.get(path) or {}
+                    # Chunks de índice além do novo total (arquivo encolheu) ou com ids antigos (uuid) sobram.
+                    stale.extend(set(previous.get("chunk_ids", [])) - set(ids))
+                    self.manifest.update(path, st, file_hash, ids)
+                    ingested += 1
+                if stale:
+                    self.vector_store.delete_batch(stale)
+                self.manifest.save()
+        return ingested
+
+    @staticmethod
+    def _split_pool() -> Optional[ProcessPoolExecutor]:
+        """Pool de processos para dividir documentos, ou None (divisão na própria thread de sincronização)."""
+        workers = min(Config.SPLIT_WORKERS, os.cpu_count() or 1)
+        if workers < 2:
+            return None
+        try:
+            return split_pool(workers)
+        except Exception as e:
+            print(f"[MEMORY] Pool de divisão indisponível, dividindo no processo principal: {e}")
+            return None
+
+    def _split_documents(self, split_pool: ProcessPoolExecutor, documents: List[Dict]):
+        """Preenche doc["chunks"] dividindo os documentos em paralelo; em caso de falha, ingest_many divide sozinho."""
+        jobs = []
+        for doc in documents:
+            metadata = doc.get("metadata") or {}
+            jobs.append((doc["content"], self.classifier.infer(doc.get("source_type", "unknown"), metadata), metadata))
+        try:
+            # Lotes por processo: cada tarefa atravessa um pipe, então poucas e grandes custam menos.
+            chunksize = max(1, len(jobs) // (Config.SPLIT_WORKERS * 4))
+            for doc, chunks in zip(documents, split_pool.map(split_document, jobs, chunksize=chunksize)):
+                doc["chunks"] = chunks
+        except Exception as e:
+            print(f"[MEMORY] Divisão em paralelo falhou, dividindo no processo principal: {e}")
+            for doc in documents:
+                doc.pop("chunks", None)
+
+    @staticmethod
+    def _read_and_hash(path: str):
+        try:
+            content = open(path, encoding="utf-8", errors="ignore").read()
+            return content, hashlib.md5(content.encode()).hexdigest()
+        except Exception as e:
+            print(f"[MEMORY] Erro ao ler {path}: {e}")
+            return None
 
     def _sync_knowledge_base(self):
         if not os.path.exists(Config.DIRS["knowledge"]): return
         
-        for root, _, files in os.walk(Config.DIRS["knowledge"]):
-            if "chroma_db" in root or "episodes" in root: continue
-            for f in files:
-                if not f.endswith((".md", ".txt", ".py", ".json", ".js", ".html")): continue
-                path = os.path.join(root, f)
-                try:
-                    content = open(path, encoding="utf-8", errors="ignore").read()
-                    file_hash = hashlib.md5(content.encode()).hexdigest()
-                    if file_hash in self.ingested_hashes: continue
-                    self.ingest_universal(content, "file_content", {"filename": f, "path": path}, thread_id="system")
-                    self.ingested_hashes.add(file_hash)
-                except: pass
-        self._save_cache()
+        def paths():
+            for root, _, files in os.walk(Config.DIRS["knowledge"]):
+                if "chroma_db" in root or "episodes" in root: continue
+                for f in files:
+                    # Arquivos ocultos incluem o próprio manifesto, que muda a cada sincronização.
+                    if f.startswith(".") or not f.endswith((".md", ".txt", ".py", ".json", ".js", ".html")): continue
+                    yield os.path.join(root, f)
+
+        def make_doc(path, content):
+            return {"content": content, "source_type": "file_content", "metadata": {"filename": os.path.basename(path), "path": path}, "thread_id": "system"}
+
+        self._sync_files(paths(), make_doc)
 
     def _sync_codebase(self):
         system_folders = ["agents", "tools", "core", "memory", "interface"]
         project_root = os.getcwd() 
 
-        for folder in system_folders:
-            folder_path = os.path.join(project_root, folder)
-            if not os.path.exists(folder_path): continue
+        def paths():
+            for folder in system_folders:
+                folder_path = os.path.join(project_root, folder)
+                if not os.path.exists(folder_path): continue
 
-            for root, _, files in os.walk(folder_path):
-                for f in files:
-                    if f.endswith(".py"): 
-                        path = os.path.join(root, f)
-                        try:
-                            content = open(path, encoding="utf-8", errors="ignore").read()
-                            
-                            file_hash = hashlib.md5(content.encode()).hexdigest()
-                            if file_hash in self.ingested_hashes: continue
-                            
-                            print(f"[AUTO-LEITURA] Aprendendo: {folder}/{f}")
-                            self.ingest_universal(
-                                content, 
-                                "system_source_code", 
-                                {
-                                    "filename": f, 
-                                    "path": path, 
-                                    "module": folder,
-                                    "description": f"Código fonte do sistema Trebuchet: módulo {folder}"
-                                },
-                                thread_id="system"
-                            )
-                            self.ingested_hashes.add(file_hash)
-                        except Exception as e: 
-                            print(f"Erro ao ler {f}: {e}")
+                for root, _, files in os.walk(folder_path):
+                    for f in files:
+                        if f.endswith(".py"): 
+                            yield os.path.join(root, f)
+
+        def make_doc(path, content):
+            folder = os.path.relpath(path, project_root).split(os.sep)[0]
+            f = os.path.basename(path)
+            print(f"[AUTO-LEITURA] Aprendendo: {folder}/{f}")
+            return {
+                "content": content,
+                "source_type": "system_source_code",
+                "metadata": {
+                    "filename": f, 
+                    "path": path, 
+                    "module": folder,
+                    "description": f"Código fonte do sistema Trebuchet: módulo {folder}"
+                },
+                "thread_id": "system"
+            }
         
-        self._save_cache()
\ No newline at end of file
+        self._sync_files(paths(), make_doc)
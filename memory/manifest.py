@@ -0,0 +1,67 @@
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Set
+
+class IngestionManifest:
+    """
+    Estado da sincronização por caminho: {path: {mtime, size, hash, chunk_ids}}.
+    Arquivos cujo (mtime, size) não mudou são pulados com um único stat, sem leitura nem hash.
+    """
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.legacy_hashes: Set[str] = set()
+        self._lock = threading.Lock()
+        self._load(legacy_path)
+
+    def _load(self, legacy_path: Optional[str]):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except Exception:
+                self.entries = {}
+        elif legacy_path and os.path.exists(legacy_path):
+            # Migração do antigo .ingested.json (conjunto de hashes): arquivos com hash conhecido
+            # entram no manifesto sem reingestão na primeira sincronização.
+            try:
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    self.legacy_hashes = set(json.load(f))
+                print(f"[MEMORY] Migrando {len(self.legacy_hashes)} hashes de {os.path.basename(legacy_path)} para o manifesto.")
+            except Exception:
+                self.legacy_hashes = set()
+
+    @staticmethod
+    def fingerprint(st: os.stat_result) -> Dict:
+        return {"mtime": st.st_mtime_ns, "size": st.st_size}
+
+    def is_unchanged(self, path: str, st: os.stat_result) -> bool:
+        entry = self.entries.get(path)
+        return bool(entry) and entry.get("mtime") == st.st_mtime_ns and entry.get("size") == st.st_size
+
+    def known_hash(self, path: str, file_hash: str) -> bool:
+        entry = self.entries.get(path)
+        return (entry is not None and entry.get("hash") == file_hash) or file_hash in self.legacy_hashes
+
+    def get(self, path: str) -> Optional[Dict]:
+        return self.entries.get(path)
+
+    def update(self, path: str, st: os.stat_result, file_hash: str, chunk_ids: Optional[List[str]] = None):
+        with self._lock:
+            previous = self.entries.get(path, {})
+            entry = dict(self.fingerprint(st), hash=file_hash)
+            entry["chunk_ids"] = chunk_ids if chunk_ids is not None else previous.get("chunk_ids", [])
+            self.entries[path] = entry
+
+    def remove(self, path: str) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.pop(path, None)
+
+    def save(self):
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import sqlite3
+import datetime
+import threading
+from typing import Dict, Iterable, List, Optional
+from core.config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    doc_id TEXT,
+    thread_id TEXT,
+    kind TEXT,
+    seq INTEGER,
+    timestamp REAL,
+    content TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_thread ON documents(source, thread_id, seq);
+CREATE INDEX IF NOT EXISTS idx_documents_ts ON documents(timestamp);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    content, content='documents', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+CREATE TABLE IF NOT EXISTS chat_files (
+    thread_id TEXT PRIMARY KEY,
+    mtime REAL,
+    messages INTEGER
+);
+"""
+
+class TextIndex:
+    """
+    Índice full-text (SQLite FTS5) de episódios e conversas, mantido incrementalmente.
+    Busca com ranking BM25, filtros por thread/tempo e trechos destacados.
+    A coluna kind guarda o papel (user/assistant) nas conversas e o tipo do evento nos episódios.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(Config.DIRS["knowledge"], "search_index.sqlite")
+        # A conexão é compartilhada entre threads (check_same_thread=False): leituras e escritas passam pelo lock.
+        self._db_lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def get_instance(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    # --- Escrita ---
+
+    def add_episodes(self, rows: Iterable[tuple]):
+        """Recebe as linhas no formato do EpisodicStore: (id, timestamp, iso_time, type, thread_id, domain, content, metadata)."""
+        docs = [("episode", r[0], r[4], r[3], None, r[1], r[6]) for r in rows if r[6]]
+        if not docs:
+            return
+        with self._db_lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO documents (source, doc_id, thread_id, kind, seq, timestamp, content) VALUES (?, ?, ?, ?, ?, ?, ?)", docs
+            )
+
+    def index_chat(self, thread_id: str, messages: List[Dict], timestamp: Optional[float] = None, mtime: Optional[float] = None):
+        """Indexa só as mensagens novas da conversa; se ela encolheu (edição/limpeza), reindexa do zero."""
+        with self._db_lock:
+            row = self.conn.execute("SELECT messages FROM chat_files WHERE thread_id = ?", (thread_id,)).fetchone()
+            indexed = row["messages"] if row else 0
+            with self.conn:
+                if indexed > len(messages):
+                    self.conn.execute("DELETE FROM documents WHERE source = 'chat' AND thread_id = ?", (thread_id,))
+                    indexed = 0
+                ts = timestamp or datetime.datetime.now().timestamp()
+                docs = [
+                    ("chat", f"{thread_id}:{seq}", thread_id, msg.get("role"), seq, ts, str(msg.get("content", "")))
+                    for seq, msg in enumerate(messages[indexed:], start=indexed)
+                ]
+                self.conn.executemany(
+                    "INSERT INTO documents (source, doc_id, thread_id, kind, seq, timestamp, content) VALUES (?, ?, ?, ?, ?, ?, ?)", docs
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO chat_files (thread_id, mtime, messages) VALUES (?, ?, ?)",
+                    (thread_id, mtime, len(messages))
+                )
+
+    def index_chat_dir(self, directory: str):
+        """Atualiza o índice com os arquivos de conversa que mudaram desde a última passagem (por mtime)."""
+        if not os.path.isdir(directory):
+            return
+        with self._db_lock:
+            known = {r["thread_id"]: r["mtime"] for r in self.conn.execute("SELECT thread_id, mtime FROM chat_files")}
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+                thread_id = name[:-5]
+                if known.get(thread_id) == mtime:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                ts = datetime.datetime.fromisoformat(data["timestamp"]).timestamp() if data.get("timestamp") else mtime
+                self.index_chat(data.get("id", thread_id), data.get("messages", []), timestamp=ts, mtime=mtime)
+            except Exception as e:
+                print(f"[MEMORY] Falha ao indexar conversa {name}: {e}")
+
+    # --- Leitura ---
+
+    @staticmethod
+    def _match_expression(query: str, operator: str) -> str:
+        terms = re.findall(r"\w+", query or "")
+        return f" {operator} ".join(f'"{t}"' for t in terms)
+
+    def search(self, query: str, limit: int = 10, source: Optional[str] = None, thread_id: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        clauses, params = [], []
+        for column, value in (("d.source", source), ("d.thread_id", thread_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("d.timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("d.timestamp <= ?")
+            params.append(until)
+        filters = "".join(f" AND {c}" for c in clauses)
+
+        # Primeiro exige todos os termos; sem resultados, aceita qualquer um deles (ainda ranqueado por BM25).
+        for operator in ("AND", "OR"):
+            expression = self._match_expression(query, operator)
+            if not expression:
+                return []
+            with self._db_lock:
+                rows = self.conn.execute(
+                    f"""SELECT d.source, d.doc_id, d.thread_id, d.kind, d.seq, d.timestamp,
+                               snippet(documents_fts, 0, '[', ']', '…', {Config.SEARCH_SNIPPET_TOKENS}) AS snippet,
+                               bm25(documents_fts) AS score
+                        FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid
+                        WHERE documents_fts MATCH ?{filters}
+                        ORDER BY score LIMIT ?""",
+                    [expression] + params + [limit]
+                ).fetchall()
+            if rows:
+                return [dict(row, score=round(-row["score"], 4)) for row in rows]
+        return []
+
+    def chat_history(self, thread_id: Optional[str] = None, limit: int = 20) -> Dict:
+        """Últimas mensagens de uma conversa (a mais recente, se thread_id não for informado)."""
+        with self._db_lock:
+            if thread_id is None:
+                row = self.conn.execute(
+                    "SELECT thread_id FROM documents WHERE source = 'chat' ORDER BY timestamp DESC, rowid DESC LIMIT 1"
+                ).fetchone()
+                if not row:
+                    return {"thread_id": None, "messages": []}
+                thread_id = row["thread_id"]
+            rows = self.conn.execute(
+                "SELECT kind AS role, seq, content FROM documents WHERE source = 'chat' AND thread_id = ? ORDER BY seq DESC LIMIT ?",
+                (thread_id, limit)
+            ).fetchall()
+        return {"thread_id": thread_id, "messages": [dict(r) for r in reversed(rows)]}
@@ -14,4 +14,5 @@ from tools.libs.notion import NotionTool
 from tools.libs.speak import SpeakTool
 from tools.libs.video import HunyuanVideoTool
 from tools.libs.vision import VisionTool
-from tools.libs.log_reader import LogReaderTool
\ No newline at end of file
+from tools.libs.log_reader import LogReaderTool
+from tools.libs.blob_reader import BlobReaderTool
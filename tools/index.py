@@ -0,0 +1,105 @@
+import os
+import re
+import json
+import math
+import hashlib
+from typing import Callable, Dict, List, Optional
+from core.config import Config
+
+def schema_hash(tool) -> str:
+    payload = json.dumps([tool.name, tool.description, tool.parameters], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+def compact_schema(parameters: Dict) -> str:
+    """Renderiza o schema em JSON minificado, sem defaults e sem o envelope 'type: object'. Limites numéricos ficam."""
+    props = {}
+    for name, spec in (parameters or {}).get("properties", {}).items():
+        entry = {k: v for k, v in spec.items() if k != "default"}
+        if entry.get("type") == "string" and len(entry) > 1:
+            entry.pop("type")
+        props[name] = entry
+    required = (parameters or {}).get("required", [])
+    body = {"args": props}
+    if required:
+        body["req"] = required
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"))
+
+def _tokens(text: str) -> set:
+    return {t for t in re.findall(r"\w+", (text or "").lower()) if len(t) > 2}
+
+class ToolIndex:
+    """Índice de recuperação de ferramentas: embeddings das descrições/schemas, cacheados em disco pelo hash do schema."""
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path or os.path.join(Config.DIRS["cache"], "tool_index.json")
+        self.embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None
+        self.model_name = ""
+        self.vectors: Dict[str, List[float]] = {}
+        self.texts: Dict[str, str] = {}
+
+    @staticmethod
+    def document(tool) -> str:
+        props = ", ".join(f"{k}: {v.get('description', '')}" for k, v in tool.parameters.get("properties", {}).items())
+        return f"{tool.name}: {tool.description} {props}"
+
+    def _load_cache(self) -> Dict:
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return {}
+
+    def build(self, tools: Dict, embed_fn: Callable[[List[str]], List[List[float]]] = None, model_name: str = "default"):
+        self.texts = {name: self.document(tool) for name, tool in tools.items()}
+        if embed_fn is None:
+            return
+
+        self.embed_fn = embed_fn
+        self.model_name = model_name
+        cache = self._load_cache()
+        keys = {name: f"{model_name}:{schema_hash(tool)}" for name, tool in tools.items()}
+
+        missing = [name for name, key in keys.items() if key not in cache]
+        if missing:
+            try:
+                vectors = embed_fn([self.texts[name] for name in missing])
+            except Exception as e:
+                print(f"[TOOLS] Falha ao indexar ferramentas: {e}")
+                return
+            for name, vector in zip(missing, vectors):
+                cache[keys[name]] = [round(float(x), 6) for x in vector]
+            live = set(keys.values())
+            cache = {k: v for k, v in cache.items() if k in live or not k.startswith(f"{model_name}:")}
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+
+        self.vectors = {name: cache[key] for name, key in keys.items() if key in cache}
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        na = math.sqrt(sum(x * x for x in a))
+        nb = math.sqrt(sum(y * y for y in b))
+        return dot / (na * nb) if na and nb else 0.0
+
+    def rank(self, query: str, candidates: List[str]) -> List[str]:
+        if self.embed_fn is not None and self.vectors:
+            try:
+                qvec = self.embed_fn([query])[0]
+                scores = {name: self._cosine(qvec, self.vectors[name]) for name in candidates if name in self.vectors}
+                if scores:
+                    rest = [name for name in candidates if name not in scores]
+                    return sorted(scores, key=scores.get, reverse=True) + rest
+            except Exception as e:
+                print(f"[TOOLS] Falha na busca semântica de ferramentas, usando busca léxica: {e}")
+
+        qtokens = _tokens(query)
+        return sorted(candidates, key=lambda name: len(qtokens & _tokens(self.texts.get(name, name))), reverse=True)
+
+    def shortlist(self, query: str, candidates: List[str], top_k: int = None) -> List[str]:
+        top_k = top_k or Config.TOOL_SHORTLIST_K
+        pinned = [name for name in Config.TOOL_ALWAYS_INCLUDE if name in candidates]
+        ranked = [name for name in self.rank(query, candidates) if name not in pinned]
+        return ranked[:max(0, top_k - len(pinned))] + pinned
@@ -0,0 +1,49 @@
+from tools.base import BaseTool, ToolResult
+from memory.blob_store import BlobStore
+
+class BlobReaderTool(BaseTool):
+    name = "read_blob"
+    description = "Lê a saída completa de uma ferramenta executada anteriormente, página por página. Use quando o log mostrar 'blob:<id>' e você precisar do conteúdo truncado."
+
+    parameters = {
+        "type": "object",
+        "properties": {
+            "blob_id": {
+                "type": "string",
+                "description": "Identificador do blob (o valor após 'blob:' no log, pode ser o prefixo)."
+            },
+            "page": {
+                "type": "integer",
+                "description": "Página a ler, começando em 0 (padrão: 0).",
+                "default": 0
+            }
+        },
+        "required": ["blob_id"]
+    }
+
+    config_schema = {
+        "type": "object",
+        "properties": {
+            "page_size": {
+                "type": "integer",
+                "description": "Caracteres por página",
+                "default": 2000,
+                "minimum": 500,
+                "maximum": 8000
+            }
+        }
+    }
+
+    def run(self, blob_id: str, page: int = 0, config: dict = None, **kwargs) -> ToolResult:
+        page_size = int((config or {}).get("page_size", 2000))
+        result = BlobStore.get_instance().read_page(blob_id, page=page, page_size=page_size)
+
+        if not result["found"]:
+            return {"success": False, "output": f"Erro: blob '{blob_id}' não encontrado.", "metadata": {"error": "not_found"}}
+
+        header = f"[blob:{blob_id} | página {result['page'] + 1}/{result['total_pages']} | {result['total_chars']} chars]"
+        return {
+            "success": True,
+            "output": f"{header}\n{result['content']}",
+            "metadata": {"page": result["page"], "total_pages": result["total_pages"]}
+        }
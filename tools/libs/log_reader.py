@@ -1,8 +1,8 @@
-import os
 import json
-from typing import Dict, List
+import time
 from tools.base import BaseTool, ToolResult
-from core.config import Config
+from memory.episodic import EpisodicStore
+from memory.text_index import TextIndex
 
 class LogReaderTool(BaseTool):
     name = "log_reader"
@@ -24,39 +24,47 @@ class LogReaderTool(BaseTool):
             "query": {
                 "type": "string",
                 "description": "Termo de busca (obrigatório para o modo 'search_text')."
+            },
+            "thread_id": {
+                "type": "string",
+                "description": "Restringe a uma conversa/thread. No modo 'chat_history', sem ele é usada a conversa mais recente."
+            },
+            "days": {
+                "type": "integer",
+                "description": "No modo 'search_text', considera apenas os últimos N dias."
+            },
+            "source": {
+                "type": "string",
+                "enum": ["episode", "chat"],
+                "description": "No modo 'search_text', busca só em eventos do sistema ('episode') ou só em conversas ('chat')."
             }
         },
         "required": ["mode"]
     }
 
-    def run(self, mode: str, limit: int = 10, query: str = None, **kwargs) -> ToolResult:
-        episodic_path = Config.DIRS["episodic"]
+    def run(self, mode: str, limit: int = 10, query: str = None, thread_id: str = None, days: int = None, source: str = None, **kwargs) -> ToolResult:
+        store = EpisodicStore.get_instance()
+        index = TextIndex.get_instance()
         
         try:
             if mode == "recent_events":
-                files = sorted(os.listdir(episodic_path), reverse=True)[:limit]
-                logs = []
-                for f in files:
-                    with open(os.path.join(episodic_path, f), "r", encoding="utf-8") as fd:
-                        logs.append(json.load(fd))
+                logs = store.query(limit=limit, thread_id=thread_id)
                 return {"success": True, "output": json.dumps(logs, indent=2), "metadata": {}}
 
             elif mode == "search_text":
                 if not query:
                     return {"success": False, "output": "Erro: 'query' é necessário para busca.", "metadata": {}}
                 
-                results = []
-                for f in os.listdir(episodic_path):
-                    with open(os.path.join(episodic_path, f), "r", encoding="utf-8") as fd:
-                        data = json.load(fd)
-                        if query.lower() in str(data.get("content", "")).lower():
-                            results.append(data)
-                            if len(results) >= limit: break
-                
-                return {"success": True, "output": json.dumps(results, indent=2), "metadata": {}}
+                since = time.time() - days * 86400 if days else None
+                results = index.search(query, limit=limit, source=source, thread_id=thread_id, since=since)
+                return {"success": True, "output": json.dumps(results, indent=2, ensure_ascii=False), "metadata": {"hits": len(results)}}
 
             elif mode == "chat_history":
-                return {"success": True, "output": "Funcionalidade de leitura de chat_id específica requer integração com a UI.", "metadata": {}}
+                chat = index.chat_history(thread_id, limit=limit)
+                if not chat["messages"]:
+                    return {"success": True, "output": "Nenhuma conversa indexada encontrada.", "metadata": {}}
+                lines = [f"{m['role'].upper()}: {m['content']}" for m in chat["messages"]]
+                return {"success": True, "output": f"Conversa {chat['thread_id']}:\n" + "\n".join(lines), "metadata": {"thread_id": chat["thread_id"]}}
 
             return {"success": False, "output": "Modo inválido.", "metadata": {}}
 
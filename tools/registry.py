@@ -4,9 +4,12 @@ import inspect
 import os
 import sys
 import json
-from typing import Dict, Any, List
+import threading
+from typing import Callable, Dict, Any, List
 from core.config import Config
 from tools.base import BaseTool
+from core.tracing import Tracer
+from tools.index import ToolIndex, compact_schema
 import tools.libs
 
 class ToolRegistry:
@@ -14,6 +17,27 @@ class ToolRegistry:
         self.tools: Dict[str, BaseTool] = {}
         self._register_builtins()
         self._load_plugins()
+        self.index = ToolIndex()
+        self.index.build(self.tools)
+        self._embedder_set = False
+
+    def set_embedder(self, embed_fn, model_name: str = None, wait_ready: Callable[[], bool] = None):
+        """
+        Indexa descrições e schemas das ferramentas em segundo plano, depois que o embedder estiver pronto;
+        até lá a lista curta usa a busca léxica. Vetores já calculados vêm do cache em disco. Só a primeira chamada vale.
+        wait_ready bloqueia até o embedder subir ou falhar de vez; se falhar, a lista curta fica só na busca léxica.
+        """
+        if self._embedder_set:
+            return
+        self._embedder_set = True
+
+        def build():
+            if wait_ready is not None and not wait_ready():
+                print("[TOOLS] Embedder indisponível; seleção de ferramentas segue só com a busca léxica.")
+                return
+            self.index.build(self.tools, embed_fn, model_name or Config.EMBEDDING_MODEL)
+
+        threading.Thread(target=build, name="tool-index", daemon=True).start()
 
     def _register_builtins(self):
         libs_path = os.path.dirname(tools.libs.__file__)
@@ -74,12 +98,24 @@ class ToolRegistry:
                 except Exception as e:
                     print(f"[TOOLS] Falha ao carregar plugin {filename}: {str(e)}")
 
-    def get_prompt_list(self, active_tools=None) -> str:
-        prompt = "FERRAMENTAS DISPONÍVEIS:\n"
-        for name, tool in self.tools.items():
+    def get_prompt_list(self, active_tools=None, query: str = None, top_k: int = None) -> str:
+        names = []
+        for name in self.tools:
             if active_tools and name not in active_tools:
                 continue
-            prompt += f"- {name}: {tool.description} (Args: {tool.parameters})\n"
+            if isinstance(active_tools, dict) and isinstance(active_tools.get(name), dict) and active_tools[name].get("enabled") is False:
+                continue
+            names.append(name)
+
+        shortlist = self.index.shortlist(query, names, top_k) if query else names
+        prompt = "FERRAMENTAS DISPONÍVEIS:\n"
+        for name in shortlist:
+            tool = self.tools[name]
+            prompt += f"- {name}: {tool.description} {compact_schema(tool.parameters)}\n"
+
+        omitted = [name for name in names if name not in shortlist]
+        if omitted:
+            prompt += f"Outras ferramentas (use se necessário): {', '.join(omitted)}\n"
         return prompt
 
     def _validate_args(self, tool: BaseTool, args: Dict[str, Any]) -> List[str]:
@@ -120,6 +156,12 @@ class ToolRegistry:
         return errors
 
     def execute(self, tool_name: str, args: Dict) -> Dict:
+        with Tracer.get_instance().span(tool_name or "unknown", kind="tool", args=list((args or {}).keys())) as span:
+            result = self._execute(tool_name, args)
+            span.set(success=result.get("success"), output_chars=len(str(result.get("output", ""))))
+            return result
+
+    def _execute(self, tool_name: str, args: Dict) -> Dict:
         if tool_name not in self.tools:
             return {"success": False, "output": f"ERRO: Ferramenta '{tool_name}' não existe. Escolha uma da lista.", "metadata": {"error": True}}
         